@@ -1,7 +1,10 @@
+import copy
 from typing import Tuple
 from exceptions import *
-from State import State
-from alphabeta import alphabeta
+from alphabeta import SearchResult, iterative_deepening, principal_variation
+from parallel import parallel_search
+from ponder import Ponder
+from transposition import TranspositionTable
 from Checkers import Checkers
 
 
@@ -10,22 +13,80 @@ class TextCheckers(Checkers):
     A class that extends Checkers class. The game is playable through a text interface.
 
     attributes:
-        ai_depth - depth of the AI algorithm used to help the player
+        ai_depth - maximum depth of the AI algorithm (None - only ai_time limits the search)
+        ai_time - time in seconds the AI algorithm may think about a move
+        ai_workers - number of processes searching in parallel (1 - search in this process)
+        ai_tablebase - endgame tablebase probed by the AI algorithm (None or class Tablebase)
+        ai_book - opening book answering the first moves without a search (None or class
+            OpeningBook)
+        ai_stats - whether the AI algorithm collects statistics of its searches (bool)
+        last_search - statistics of the last search of the AI algorithm, None for a book move
+            or when ai_stats is off (None or class SearchResult)
+        ai_ponder - whether the AI algorithm searches while the opponent thinks (bool)
+        _ponder - search running on the opponent's time (None or class Ponder)
+        _prediction - expected reply to the last move of the AI algorithm (None or list)
+        ai_table_mb - memory of the transposition table of the game in megabytes
+        ai_table - transposition table kept between the searches of the game, so every
+            search starts from the trees searched before (None until the first search or
+            class TranspositionTable)
+        _analysis - the last analysed position: tuple (_analysis_key, result of analyse) -
+            the result is used only in the same position, the draw counter and a move
+            going on included (None or tuple)
     """
 
-    def __init__(self, player1_name="p1", player2_name="p2", arrange_pieces=True):
+    # attributes of the game session, searched copies of the game start without them
+    _session_attributes = ("ai_table", "_analysis", "_ponder")
+    # read-only data of the session, searched copies of the game share them
+    _shared_attributes = ("ai_book", "ai_tablebase")
+
+    def __init__(
+        self,
+        player1_name="p1",
+        player2_name="p2",
+        arrange_pieces=True,
+        evaluation=None,
+        width=Checkers.default_width,
+    ):
         super().__init__(
             player_arguments=({"name": player1_name}, {"name": player2_name}),
+            board_arguments={"width": width},
             arrange_pieces=arrange_pieces,
+            evaluation=evaluation,
         )
-        self.ai_depth = 3
+        self.ai_depth = None
+        self.ai_time = 1.0
+        self.ai_workers = 1
+        self.ai_tablebase = None
+        self.ai_book = None
+        self.ai_stats = False
+        self.last_search = None
+        self.ai_ponder = False
+        self._ponder = None
+        self._prediction = None
+        self.ai_table_mb = 16
+        self.ai_table = None
+        self._analysis = None
+
+    def __deepcopy__(self, memo):
+        other = type(self).__new__(type(self))
+        memo[id(self)] = other
+        for name, value in self.__dict__.items():
+            if name in type(self)._session_attributes:
+                value = None
+            elif name in type(self)._shared_attributes:
+                pass
+            else:
+                value = copy.deepcopy(value, memo)
+            setattr(other, name, value)
+        return other
 
     @staticmethod
-    def tr(place: str) -> Tuple[int, int]:
+    def tr(place: str, width: int = Checkers.default_width) -> Tuple[int, int]:
         """Translate text coordinates to tuple coordinates
 
         Args:
-            place (str): text coordinate, ex. "b6"
+            place (str): text coordinate, ex. "b6" (or "b10" on wider boards)
+            width (int, optional): width of the board. Defaults to 8.
 
         Raises:
             WrongPositionException: Impossible position (possibly out-of-bounds)
@@ -33,41 +94,45 @@ class TextCheckers(Checkers):
         Returns:
             Tuple[int, int]: Row, Column
         """
-        if len(place) != 2:
+        if len(place) < 2:
             raise WrongPositionException(place)
-        if ord("a") <= ord(place[0]) <= ord("h"):
-            col = ord(place[0]) - ord("a")
-        else:
+        col = ord(place[0]) - ord("a")
+        if not 0 <= col < width:
             raise WrongPositionException(place)
 
-        try:
-            val = int(place[1])
-        except ValueError:
+        if not place[1:].isdigit():
             raise WrongPositionException(place)
-        if 1 <= val <= 8:
-            row = 8 - val
+        val = int(place[1:])
+        if 1 <= val <= width:
+            row = width - val
         else:
             raise WrongPositionException(place)
 
         return row, col
 
     @classmethod
-    def tr_move(cls, move: str):
+    def tr_move(cls, move: str, width: int = Checkers.default_width):
         move = "".join(move.split()).lower()  # strip from any whitespaces
-        if len(move) != 6:
-            raise WrongMoveException(move)
-        if move[2:4] != "->":
+        if "->" not in move:
             raise WrongMoveSyntax(move)
-        return cls.tr(move[0:2]), cls.tr(move[4:6])
+        places = move.split("->")
+        if len(places) != 2:
+            raise WrongMoveException(move)
+        return cls.tr(places[0], width), cls.tr(places[1], width)
 
     @staticmethod
-    def tr_back(place: Tuple[int, int], dest: Tuple[int, int] = None) -> str:
+    def tr_back(
+        place: Tuple[int, int],
+        dest: Tuple[int, int] = None,
+        width: int = Checkers.default_width,
+    ) -> str:
         """Translate position from tuple to text coordinate
 
         Args:
             place (Tuple[int, int]): (Row, Column) source position
             dest (Tuple[int, int], optional): (Row, Column) destination position.
                                               Defaults to None.
+            width (int, optional): width of the board. Defaults to 8.
 
         Returns:
             str: text coordinate, ex. "b6"
@@ -75,13 +140,140 @@ class TextCheckers(Checkers):
         row, col = place
         if dest is not None:
             dest_row, dest_col = dest
-            return f"{chr(ord('a') + col)}{8 - row}->{chr(ord('a') + dest_col)}{8 - dest_row}"
+            return f"{chr(ord('a') + col)}{width - row}->{chr(ord('a') + dest_col)}{width - dest_row}"
+        else:
+            return f"{chr(ord('a') + col)}{width - row}"
+
+    def ai_move(self):
+        """Search the best move of the current player within ai_depth and ai_time,
+        with ai_workers processes. Positions of ai_book are answered without a search,
+        a position pondered on is answered by the pondering search.
+
+        Returns:
+            list: steps of the move (tuples of positions: origin, destination) or None
+        """
+        self.last_search = None
+        ponder, self._ponder = self._ponder, None
+        self._prediction = None
+        table = None
+        try:
+            if ponder is not None:
+                found = ponder.answer(self, self.ai_time)
+                if found is not None:
+                    moves, line = found
+                    depth, score = ponder.best[:2]
+                    if self.ai_stats:
+                        self.last_search = SearchResult()
+                        self.last_search.score = score
+                        self.last_search.moves = moves
+                        self.last_search.depth = depth
+                        self.last_search.line = line
+                        self.last_search.finish()
+                    self._analysis = self._analysis_key(), (score, moves, depth, line)
+                    self._prediction = line[1] if len(line) > 1 else None
+                    return moves
+                # the table filled while pondering gives a warm start
+                table = ponder.table
+            if self.ai_book is not None:
+                moves = self.ai_book.choose(self)
+                if moves is not None:
+                    return moves
+            _, moves, _, line = self.analyse(table)
+            if len(line) > 1 and line[0] == moves:
+                self._prediction = line[1]
+            return moves
+        finally:
+            del table
+            if ponder is not None:
+                ponder.close()
+
+    def analyse(self, table=None):
+        """Search the position of the current player within ai_depth and ai_time, with
+        ai_workers processes. A position is searched once, asking again gives the result
+        at once. The search starts from ai_table, the trees of earlier searches included.
+        While pondering it searches the table of the pondering search, which replaces
+        ai_table when the pondering ends.
+
+        Args:
+            table (TranspositionTable, optional): table used instead of ai_table.
+
+        Returns:
+            tuple: score of the player1, the best move (a list of steps or None), depth of
+                the search, principal variation (a list of moves)
+        """
+        if self._analysis is not None and self._analysis[0] == self._analysis_key():
+            self.last_search = None
+            return self._analysis[1]
+        stats = SearchResult(timing=True) if self.ai_stats else None
+        if self.ai_workers > 1:
+            score, moves, depth, line, nodes = parallel_search(
+                self,
+                self.ai_workers,
+                max_depth=self.ai_depth,
+                time_limit=self.ai_time,
+                tablebase=self.ai_tablebase,
+            )
+            if stats is not None:
+                # workers count their own nodes only
+                stats.score, stats.moves, stats.depth = score, moves, depth
+                stats.line, stats.nodes = line, nodes
+                stats.finish()
         else:
-            return f"{chr(ord('a') + col)}{8 - row}"
+            if table is None and self._ponder is not None:
+                table = self._ponder.table
+            if table is None:
+                table = self.session_table()
+            score, moves, depth = iterative_deepening(
+                self,
+                max_depth=self.ai_depth,
+                time_limit=self.ai_time,
+                table=table,
+                tablebase=self.ai_tablebase,
+                stats=stats,
+            )
+            line = principal_variation(self, table)
+        self.last_search = stats
+        self._analysis = self._analysis_key(), (score, moves, depth, line)
+        return self._analysis[1]
+
+    def _analysis_key(self):
+        """Function used internally. Key of the position of the cached analysis: the hash
+        leaves out the draw counter and whether the move goes on, both change the result.
+        """
+        return self.hash, self.king_moves_since_last_attack, self.must_continue
+
+    def session_table(self):
+        """Get ai_table, created by the first search."""
+        if self.ai_table is None:
+            self.ai_table = TranspositionTable(self.ai_table_mb)
+        return self.ai_table
+
+    def start_pondering(self):
+        """Search on the opponent's time if ai_ponder is on, see ai_move."""
+        self.stop_pondering()
+        if not self.ai_ponder or self.is_end_of_game():
+            return
+        predicted = self._prediction
+        if predicted not in [list(moves) for moves in self.play_moves()]:
+            predicted = None
+        self._ponder = Ponder(
+            self,
+            predicted,
+            self.ai_depth,
+            tablebase=self.ai_tablebase,
+            table=self.session_table(),
+        )
+
+    def stop_pondering(self):
+        """Cancel the search on the opponent's time."""
+        ponder, self._ponder = self._ponder, None
+        if ponder is not None:
+            ponder.close()
 
     def get_input_and_make_move(self, text=None):
         if text is None:
             text = "Your move: "
+        width = self.board.width
         while True:
             try:
                 move = input(text)
@@ -99,33 +291,36 @@ class TextCheckers(Checkers):
                                 for _move in moves:
                                     if first_iter:
                                         print(
-                                            f"{self.tr_back(_move[0])} -> {self.tr_back(_move[1])}",
+                                            f"{self.tr_back(_move[0], width=width)} -> {self.tr_back(_move[1], width=width)}",
                                             end="",
                                         )
                                         first_iter = False
                                         continue
                                     print(
-                                        f", {self.tr_back(_move[0])} -> {self.tr_back(_move[1])}",
+                                        f", {self.tr_back(_move[0], width=width)} -> {self.tr_back(_move[1], width=width)}",
                                         end="",
                                     )
                                 print()
                                 print("Alphabeta algorithm proposal: ", end="")
-                                state = State(self)
-                                alphabeta(state, 5)
-                                if state.next is not None:
-                                    if len(state.next.moves) > 0:
+                                _, proposal, _, _ = self.analyse()
+                                if proposal is not None:
+                                    if len(proposal) > 0:
                                         print(
-                                            self.tr_back(state.next.moves[0][0]), end=""
+                                            self.tr_back(proposal[0][0], width=width),
+                                            end="",
                                         )
-                                    for _move in state.next.moves:
+                                    for _move in proposal:
                                         _, dest = _move
-                                        print(f" -> {self.tr_back(dest)}", end="")
+                                        print(
+                                            f" -> {self.tr_back(dest, width=width)}",
+                                            end="",
+                                        )
                                 print()
                             break
                         except WrongPositionException as e:
                             print(e)
                     continue
-                place, dest = self.tr_move(move)
+                place, dest = self.tr_move(move, width)
                 row, col = place
                 cell = self.board[row][col]
                 if cell.is_empty():
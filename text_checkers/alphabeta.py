@@ -1,13 +1,28 @@
+import sys
+import time
 from State import State
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+from exceptions import SearchCancelled
+from transposition import TranspositionTable
+from ordering import MoveOrdering
+from tablebase import Tablebase
+from vectorized import position_masks
+
+# iterative deepening never goes deeper, whatever the budget
+depth_limit = 64
+
 
 def alphabeta(state: State, depth, alpha=float("-inf"), beta=float("+inf")):
     if depth == 0 or state.is_end_of_game():
         return state.get_score()  # score of the player1
-    U = state.get_children()
+    U = state.iter_children()  # children are copied only when the loop gets to them
     if state.is_player1_playing():
         best_score = float("-inf")
-        for u in U:
+        for _, u in U:
             score = alphabeta(u, depth - 1, alpha, beta)
             if score > best_score:
                 state.next = u
@@ -18,7 +33,7 @@ def alphabeta(state: State, depth, alpha=float("-inf"), beta=float("+inf")):
         return best_score
     else:
         best_score = float("+inf")
-        for u in U:
+        for _, u in U:
             score = alphabeta(u, depth - 1, alpha, beta)
             if score < best_score:
                 state.next = u
@@ -27,3 +42,561 @@ def alphabeta(state: State, depth, alpha=float("-inf"), beta=float("+inf")):
             if alpha >= beta:
                 break
         return best_score
+
+
+def won_score(game, ply=0):
+    """
+    Get the score of a won game on the scale of the scores of the tablebase: the winner
+    gets Tablebase.win_score less the distance from the root, so shorter wins score higher.
+    :param game: game (class Checkers)
+    :param ply: distance from the root of the search (int)
+    :return: score of the player1 or None if the game is not won
+    """
+    if not game.is_end_of_game() or game.winner is None:
+        return None
+    score = Tablebase.win_score - ply
+    return score if game.winner == game.player1 else -score
+
+
+class SearchLimits:
+    """
+    A class representing the budget of a search, checked in every node.
+
+    class variables:
+        stop_interval - number of nodes between checks of the stop event
+
+    attributes:
+        deadline - value of time.monotonic() when the search must stop (None - no limit),
+        node_limit - number of nodes after which the search must stop (None - no limit),
+        stop - event which stops the search when set, e.g. by another process (None or
+            class multiprocessing.Event),
+        nodes - number of nodes visited so far (int)
+    """
+
+    stop_interval = 64
+
+    def __init__(self, time_limit=None, node_limit=None, stop=None):
+        self.deadline = None if time_limit is None else time.monotonic() + time_limit
+        self.node_limit = node_limit
+        self.stop = stop
+        self.nodes = 0
+
+    def check(self):
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchCancelled("node limit")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise SearchCancelled("time limit")
+        if (
+            self.stop is not None
+            and self.nodes % type(self).stop_interval == 0
+            and self.stop.is_set()
+        ):
+            raise SearchCancelled("stopped")
+
+
+class SearchResult:
+    """
+    A class representing the result of a search together with statistics collected while
+    it runs. Counters of the nodes are kept by the search when the object is given to it,
+    the time is split between move generation, making and taking back moves and evaluation
+    only when timing is on, as it costs two clock reads for every step.
+
+    attributes:
+        score - score of the player1 (number),
+        moves - the best move as a list of steps (None or list),
+        depth - depth of the last completed iteration (int),
+        line - principal variation, a list of moves (list),
+        nodes - number of searched nodes (int),
+        leaves - number of evaluated positions - ends of the game and nodes of depth 0 (int),
+        cutoffs - number of beta cutoffs at ply 0, 1, 2... (list of ints),
+        max_ply - the greatest distance from the root searched (int),
+        iterations - completed iterations of iterative deepening: tuples (depth, score, number
+            of nodes of the iteration, seconds since the start) (list),
+        time - duration of the search in seconds (float),
+        timing - whether time is measured for the parts of the search (bool),
+        generation_time - seconds spent generating moves (float),
+        make_time - seconds spent making and taking back moves (float),
+        evaluation_time - seconds spent evaluating positions (float),
+        peak_memory - the greatest memory used by the process in bytes (None or int),
+        on_iteration - called with this object after every iteration (None or function),
+        on_node - called with the game, depth and ply every sample_interval nodes (None or
+            function),
+        sample_interval - number of nodes between calls of on_node (int)
+    """
+
+    def __init__(
+        self, timing=False, on_iteration=None, on_node=None, sample_interval=1024
+    ):
+        self.score = None
+        self.moves = None
+        self.depth = 0
+        self.line = []
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = []
+        self.max_ply = 0
+        self.iterations = []
+        self.time = 0.0
+        self.timing = timing
+        self.generation_time = 0.0
+        self.make_time = 0.0
+        self.evaluation_time = 0.0
+        self.peak_memory = None
+        self.on_iteration = on_iteration
+        self.on_node = on_node
+        self.sample_interval = sample_interval
+        self._start = time.perf_counter()
+
+    def cutoff(self, ply):
+        while len(self.cutoffs) <= ply:
+            self.cutoffs.append(0)
+        self.cutoffs[ply] += 1
+
+    def iteration(self, depth, score, moves):
+        """Record a completed iteration and call on_iteration."""
+        nodes = self.nodes - sum(iteration[2] for iteration in self.iterations)
+        self.iterations.append((depth, score, nodes, time.perf_counter() - self._start))
+        self.score, self.moves, self.depth = score, moves, depth
+        if self.on_iteration is not None:
+            self.on_iteration(self)
+
+    def finish(self):
+        """Record the duration of the search and the peak memory."""
+        self.time = time.perf_counter() - self._start
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # bytes on macOS, kilobytes elsewhere
+            self.peak_memory = peak if sys.platform == "darwin" else peak * 1024
+
+    def branching_factor(self):
+        """
+        Effective branching factor: nodes of the last iteration divided by nodes of the one
+        before it (None for fewer than two iterations).
+        """
+        if len(self.iterations) < 2 or not self.iterations[-2][2]:
+            return None
+        return self.iterations[-1][2] / self.iterations[-2][2]
+
+    def nodes_per_second(self):
+        return self.nodes / self.time if self.time else 0.0
+
+    def report(self):
+        """Describe the search in a few lines of text."""
+        factor = self.branching_factor()
+        lines = [
+            f"depth {self.depth} (max ply {self.max_ply}), {self.nodes} nodes, "
+            f"{self.leaves} leaves, {self.time:.3f} s, "
+            f"{self.nodes_per_second():.0f} nodes/s, "
+            f"EBF {'-' if factor is None else f'{factor:.2f}'}",
+            "cutoffs per ply: "
+            + (
+                ", ".join(f"{ply}: {count}" for ply, count in enumerate(self.cutoffs))
+                or "-"
+            ),
+        ]
+        if self.timing:
+            lines.append(
+                f"time: move generation {self.generation_time:.3f} s, make/undo "
+                f"{self.make_time:.3f} s, evaluation {self.evaluation_time:.3f} s"
+            )
+        if self.peak_memory is not None:
+            lines.append(f"peak memory: {self.peak_memory / 2**20:.1f} MB")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return (
+            f"SearchResult(score={self.score}, depth={self.depth}, nodes={self.nodes})"
+        )
+
+
+def alphabeta_in_place(
+    game,
+    depth,
+    alpha=float("-inf"),
+    beta=float("+inf"),
+    table=None,
+    limits=None,
+    ordering=None,
+    tablebase=None,
+    stats=None,
+    batch=None,
+):
+    """
+    Alpha-beta search that walks a single game with make/undo instead of copying states.
+    The game is left exactly as it was given, also when the search is cancelled.
+    :param game: game to search (class Checkers)
+    :param depth: depth of the search
+    :param table: transposition table used for cutoffs and ordering (class
+        TranspositionTable, optional)
+    :param limits: budget of the search, SearchCancelled is raised when it runs out (class
+        SearchLimits, optional)
+    :param ordering: killer moves and history used for ordering (class MoveOrdering,
+        optional)
+    :param tablebase: endgame tablebase giving exact scores of positions with few pieces
+        (class Tablebase, optional), won positions are scored as won games, see won_score
+    :param stats: statistics counted by the search (class SearchResult, optional)
+    :param batch: evaluation of the leaves in batches, used instead of Checkers.value
+        (class vectorized.BatchEvaluation, optional)
+    :return: tuple (score of the player1, the best move as a list of steps or None)
+    """
+    best_moves = []
+    score = InPlaceSearch(table, limits, ordering, tablebase, stats, batch).search(
+        game, depth, alpha, beta, 0, best_moves
+    )
+    return score, best_moves or None
+
+
+class InPlaceSearch:
+    """
+    A class holding what all nodes of an in-place alpha-beta search share.
+
+    attributes:
+        table - transposition table (None or class TranspositionTable),
+        limits - budget of the search (None or class SearchLimits),
+        ordering - move ordering (None or class MoveOrdering),
+        tablebase - endgame tablebase (None or class Tablebase),
+        stats - statistics of the search (None or class SearchResult),
+        batch - evaluation of the leaves, nodes of depth 1 evaluate all their children in
+            a single call (None or class vectorized.BatchEvaluation)
+    """
+
+    def __init__(
+        self,
+        table=None,
+        limits=None,
+        ordering=None,
+        tablebase=None,
+        stats=None,
+        batch=None,
+    ):
+        self.table = table
+        self.limits = limits
+        self.ordering = ordering
+        self.tablebase = tablebase
+        self.stats = stats
+        self.batch = batch
+
+    def search(self, game, depth, alpha, beta, ply=0, best_moves=None):
+        """
+        Search the node, the best move is saved into best_moves only in the root (where
+        best_moves is given).
+        :param ply: distance from the root (int)
+        :return: score of the player1
+        """
+        if self.limits is not None:
+            self.limits.check()
+        stats = self.stats
+        if stats is not None:
+            stats.nodes += 1
+            if ply > stats.max_ply:
+                stats.max_ply = ply
+            if stats.on_node is not None and not stats.nodes % stats.sample_interval:
+                stats.on_node(game, depth, ply)
+        if self.tablebase is not None and best_moves is None:
+            score = self.tablebase.score(game, ply)
+            if score is not None:
+                return score
+        if depth == 0 or game.is_end_of_game():
+            if stats is not None:
+                stats.leaves += 1
+            score = won_score(game, ply)
+            if score is not None:
+                return score
+            if stats is None or not stats.timing:
+                return game.get_score(game.player1)
+            start = time.perf_counter()
+            score = game.get_score(game.player1)
+            stats.evaluation_time += time.perf_counter() - start
+            return score
+        table = self.table
+        first = None
+        if table is not None:
+            entry = table.probe(game.hash)
+            if entry is not None:
+                entry_depth, bound, score, move = entry
+                score = Tablebase.score_from_table(score, ply)
+                first = table.decode_move(move, game.board.width)
+                if entry_depth >= depth and best_moves is None:
+                    if bound == table.EXACT:
+                        return score
+                    if bound == table.LOWER:
+                        alpha = max(alpha, score)
+                    elif bound == table.UPPER:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return score
+        if depth == 1 and self.batch is not None:
+            return self.search_frontier(game, ply, best_moves)
+        original_alpha, original_beta = alpha, beta
+        best_step = None
+        key = None if self.ordering is None else self.ordering.key(game, ply)
+        if stats is not None and stats.timing:
+            children = _timed_moves(game, first, key, stats)
+        else:
+            children = game.play_moves(first, key)
+        try:
+            if game.current_player == game.player1:
+                best_score = float("-inf")
+                for moves in children:
+                    score = self.search(game, depth - 1, alpha, beta, ply + 1)
+                    if score > best_score:
+                        best_step = moves[0]
+                        if best_moves is not None:
+                            best_moves[:] = moves
+                        best_score = score
+                    alpha = max(alpha, score)
+                    if alpha >= beta:
+                        if self.ordering is not None:
+                            self.ordering.cutoff(moves[0], ply, depth)
+                        if stats is not None:
+                            stats.cutoff(ply)
+                        break
+            else:
+                best_score = float("+inf")
+                for moves in children:
+                    score = self.search(game, depth - 1, alpha, beta, ply + 1)
+                    if score < best_score:
+                        best_step = moves[0]
+                        if best_moves is not None:
+                            best_moves[:] = moves
+                        best_score = score
+                    beta = min(beta, score)
+                    if alpha >= beta:
+                        if self.ordering is not None:
+                            self.ordering.cutoff(moves[0], ply, depth)
+                        if stats is not None:
+                            stats.cutoff(ply)
+                        break
+        finally:
+            # takes back the move left on the board by a cutoff or a cancel
+            children.close()
+        if table is not None:
+            if best_score <= original_alpha:
+                bound = table.UPPER
+            elif best_score >= original_beta:
+                bound = table.LOWER
+            else:
+                bound = table.EXACT
+            table.store(
+                game.hash,
+                depth,
+                bound,
+                Tablebase.score_to_table(best_score, ply),
+                None
+                if best_step is None
+                else table.encode_move(best_step, game.board.width),
+            )
+        return best_score
+
+    def search_frontier(self, game, ply, best_moves=None):
+        """
+        Search a node of depth 1 with batch: the positions after all moves are collected
+        and evaluated at once, so there are no cutoffs and the score is exact.
+        :param ply: distance from the root (int)
+        :return: score of the player1
+        """
+        stats = self.stats
+        positions = []
+        scores = []
+        moves_list = []
+        # the transposition table does not order a node searched without cutoffs
+        children = game.play_moves()
+        try:
+            for moves in children:
+                if self.limits is not None:
+                    self.limits.check()
+                score = None
+                if stats is not None:
+                    stats.nodes += 1
+                    stats.leaves += 1
+                    stats.max_ply = max(stats.max_ply, ply + 1)
+                if self.tablebase is not None:
+                    score = self.tablebase.score(game, ply + 1)
+                if score is None and game.is_end_of_game():
+                    score = won_score(game, ply + 1)
+                    if score is None:
+                        score = game.get_score(game.player1)
+                if score is None:
+                    positions.append(position_masks(game))
+                moves_list.append(list(moves))
+                scores.append(score)
+        finally:
+            children.close()
+        if not moves_list:
+            # the winner is set when the player cannot move, the node is a leaf then
+            score = won_score(game, ply)
+            return game.get_score(game.player1) if score is None else score
+        start = time.perf_counter() if stats is not None and stats.timing else None
+        values = iter(self.batch.evaluate(positions)) if positions else iter(())
+        if start is not None:
+            stats.evaluation_time += time.perf_counter() - start
+        scores = [next(values) if score is None else score for score in scores]
+        pick = max if game.current_player == game.player1 else min
+        best_score = pick(scores)
+        best = moves_list[scores.index(best_score)]
+        if best_moves is not None:
+            best_moves[:] = best
+        if self.table is not None:
+            self.table.store(
+                game.hash,
+                1,
+                self.table.EXACT,
+                Tablebase.score_to_table(best_score, ply),
+                self.table.encode_move(best[0], game.board.width),
+            )
+        return best_score
+
+
+def _timed_moves(game, first, key, stats):
+    """
+    Function used internally. Checkers.play_moves measuring the time of move generation and
+    of making and taking back moves into stats.
+    """
+    start = time.perf_counter()
+    paths = game.move_paths()
+    if key is not None:
+        paths.sort(key=key, reverse=True)
+    if first is not None:
+        paths.sort(key=lambda path: path.steps[0] != first)
+    stats.generation_time += time.perf_counter() - start
+    for path in paths:
+        start = time.perf_counter()
+        game.apply_path(path)
+        game.next_player()
+        stats.make_time += time.perf_counter() - start
+        try:
+            yield path.steps
+        finally:
+            start = time.perf_counter()
+            game.undo()
+            game.undo()
+            stats.make_time += time.perf_counter() - start
+
+
+def iterative_deepening(
+    game,
+    max_depth=None,
+    time_limit=None,
+    node_limit=None,
+    table=None,
+    ordering=None,
+    limits=None,
+    tablebase=None,
+    stats=None,
+    batch=None,
+):
+    """
+    Search the game with alphabeta_in_place at depth 1, 2, 3... until the depth cap, the
+    time budget or the node budget runs out. Every iteration plays the best line of the
+    previous one first (through the transposition table). Depth 1 is always completed.
+    :param game: game to search (class Checkers)
+    :param max_depth: maximum depth (int, optional)
+    :param time_limit: time budget in seconds (float, optional)
+    :param node_limit: budget of visited nodes (int, optional)
+    :param table: transposition table kept between searches (class TranspositionTable,
+        optional)
+    :param ordering: killer moves and history kept between searches (class MoveOrdering,
+        optional)
+    :param limits: budget used instead of time_limit and node_limit, it counts the nodes
+        of every iteration (class SearchLimits, optional)
+    :param tablebase: endgame tablebase probed in the search (class Tablebase, optional)
+    :param stats: statistics of the search, filled in with every iteration, the principal
+        variation included (class SearchResult, optional)
+    :param batch: evaluation of the leaves in batches (class vectorized.BatchEvaluation,
+        optional)
+    :return: tuple (score of the player1, the best move as a list of steps or None, depth of
+        the last completed iteration)
+    """
+    if limits is None:
+        limits = SearchLimits(time_limit, node_limit)
+    if (
+        max_depth is None
+        and limits.deadline is None
+        and limits.node_limit is None
+        and limits.stop is None
+    ):
+        raise ValueError("Iterative deepening needs a depth, time or node limit.")
+    if max_depth is None or max_depth > depth_limit:
+        max_depth = depth_limit
+    if table is None:
+        table = TranspositionTable()
+    if ordering is None:
+        ordering = MoveOrdering()
+    table.new_search()
+    ordering.new_search()
+    first_iteration = SearchLimits()
+    score, moves = alphabeta_in_place(
+        game,
+        1,
+        table=table,
+        limits=first_iteration,
+        ordering=ordering,
+        tablebase=tablebase,
+        stats=stats,
+        batch=batch,
+    )
+    limits.nodes += first_iteration.nodes
+    depth = 1
+    if stats is not None:
+        stats.iteration(depth, score, moves)
+    while depth < max_depth:
+        try:
+            score, moves = alphabeta_in_place(
+                game,
+                depth + 1,
+                table=table,
+                limits=limits,
+                ordering=ordering,
+                tablebase=tablebase,
+                stats=stats,
+                batch=batch,
+            )
+        except SearchCancelled:
+            break
+        depth += 1
+        if stats is not None:
+            stats.iteration(depth, score, moves)
+    if stats is not None:
+        stats.line = principal_variation(game, table)
+        stats.finish()
+    return score, moves, depth
+
+
+def principal_variation(game, table, max_length=depth_limit):
+    """
+    Get the best line of the game stored in the transposition table.
+    :param game: game (class Checkers), left as it was given
+    :param table: transposition table of a search of the game (class TranspositionTable)
+    :param max_length: maximum number of moves (int)
+    :return: a list of moves (lists of steps)
+    """
+    line = []
+    seen = set()
+    played = 0
+    try:
+        while len(line) < max_length and game.hash not in seen:
+            if game.is_end_of_game():
+                break
+            seen.add(game.hash)
+            entry = table.probe(game.hash)
+            step = (
+                None if entry is None else table.decode_move(entry[3], game.board.width)
+            )
+            if step is None:
+                break
+            children = game.play_moves(step)
+            moves = next(children, None)
+            moves = None if moves is None else list(moves)
+            children.close()
+            if moves is None or moves[0] != step:
+                break
+            for orig, dest in moves:
+                game.move(orig, dest)
+            game.next_player()
+            played += len(moves) + 1
+            line.append(moves)
+    finally:
+        for _ in range(played):
+            game.undo()
+    return line
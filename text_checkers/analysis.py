@@ -0,0 +1,187 @@
+import collections
+import json
+import math
+import multiprocessing
+from Checkers import Checkers
+from alphabeta import SearchLimits, iterative_deepening, principal_variation
+from codec import check_width, from_text, to_text
+from selfplay import parse_move, move_text
+from transposition import TranspositionTable
+
+# depth of searches given neither a depth, a time nor a node limit
+default_depth = 6
+
+# tablebase of the searches of a worker process of analyse_stream, opened once per process
+_tablebase = None
+
+
+def read_position(line):
+    """
+    Read a position of the batch analysis: a position in the text form of codec, or a JSON
+    object with the text form under "position" or the moves played from the start under
+    "moves" (a list of moves written as text, ex. "c3->d4", played on the board of the
+    width under "width", 8 by default, see codec.check_width). The object may also hold
+    "id", returned with the result, and "depth" or "time" overriding the limits.
+    :param line: line of the input (str)
+    :return: tuple (game - class Checkers, fields of the JSON object - dict)
+    """
+    line = line.strip()
+    if not line.startswith("{"):
+        return from_text(line), {}
+    fields = json.loads(line)
+    if "position" in fields:
+        return from_text(fields["position"]), fields
+    width = check_width(fields.get("width", Checkers.default_width))
+    game = Checkers(board_arguments={"width": width})
+    for text in fields.get("moves", ()):
+        moves = parse_move(text, width)
+        legal = [list(_moves) for _moves in game.play_moves()]
+        if moves not in legal:
+            raise ValueError(f"Illegal move: {text}")
+        for step in moves:
+            game.move(*step)
+        game.next_player()
+    game.history.clear()
+    return game, fields
+
+
+def read_limits(fields, settings):
+    """
+    Read the limits of the search of a position of the batch analysis.
+    :param fields: fields of the JSON object of the position (dict)
+    :param settings: dict of arguments of analyse_stream
+    :return: tuple (depth - None or int, time limit - None or number)
+    """
+    depth = fields.get("depth", settings["depth"])
+    time_limit = fields.get("time", settings["time"])
+    if depth is not None and (
+        not isinstance(depth, int) or isinstance(depth, bool) or depth < 1
+    ):
+        raise ValueError(f"Wrong depth: {depth!r}")
+    if time_limit is not None and (
+        not isinstance(time_limit, (int, float))
+        or isinstance(time_limit, bool)
+        or time_limit <= 0
+    ):
+        raise ValueError(f"Wrong time: {time_limit!r}")
+    if depth is None and time_limit is None and settings["nodes"] is None:
+        depth = default_depth
+    return depth, time_limit
+
+
+def _init_worker(tablebase):
+    """Function used internally. Set the tablebase of a worker process of analyse_stream."""
+    global _tablebase
+    _tablebase = tablebase
+
+
+def analyse_line(task):
+    """
+    Search a position of the batch analysis.
+    :param task: tuple (number of the line, line, settings - dict of arguments of
+        analyse_stream)
+    :return: dict - number of the line, id (if given), position in the text form, the best
+        move, score of player1, depth of the last completed iteration, principal variation
+        and number of nodes; for an ended game the position and the winner (1, 2 or None for
+        a draw); or number of the line and an error
+    """
+    number, line, settings = task
+    result = {"line": number}
+    try:
+        return _analyse(line, settings, result)
+    except Exception as error:
+        # a wrong position fails its line only, the stream goes on
+        result["error"] = str(error) or type(error).__name__
+        return result
+
+
+def _analyse(line, settings, result):
+    """Function used internally. Search a position of analyse_line, filling result."""
+    game, fields = read_position(line)
+    if "id" in fields:
+        result["id"] = fields["id"]
+    depth, time_limit = read_limits(fields, settings)
+    if game.is_end_of_game():
+        winner = game.winner
+        result.update(
+            position=to_text(game),
+            winner=None if winner is None else 1 if winner == game.player1 else 2,
+        )
+        return result
+    tablebase = settings["tablebase"]
+    if tablebase is None:
+        tablebase = _tablebase
+    table = TranspositionTable(settings["table_mb"])
+    limits = SearchLimits(time_limit, settings["nodes"])
+    score, moves, reached = iterative_deepening(
+        game, depth, table=table, limits=limits, tablebase=tablebase
+    )
+    if not math.isfinite(score):
+        raise ValueError("The player to move has no move in the position.")
+    result.update(
+        position=to_text(game),
+        move=None if moves is None else move_text(moves, game.board.width),
+        score=score,
+        depth=reached,
+        pv=[
+            move_text(line_moves, game.board.width)
+            for line_moves in principal_variation(game, table)
+        ],
+        nodes=limits.nodes,
+    )
+    return result
+
+
+def analyse_stream(
+    lines,
+    workers=1,
+    depth=None,
+    time_limit=None,
+    node_limit=None,
+    table_mb=16,
+    tablebase=None,
+    window=None,
+):
+    """
+    Analyse positions read from lines in a pool of processes. Results come in the order
+    of the lines and at most window lines are read ahead of the last result, so the memory
+    does not grow with the input.
+    :param lines: iterable of lines, see read_position (empty lines are skipped)
+    :param workers: number of processes (int), 1 searches in this process
+    :param depth: maximum depth of the searches (int, optional - default_depth if there is
+        no other limit)
+    :param time_limit: time budget of a position in seconds (float, optional)
+    :param node_limit: budget of nodes of a position (int, optional)
+    :param table_mb: memory of the transposition table of a search in megabytes
+    :param tablebase: endgame tablebase probed by the searches (class Tablebase, optional)
+    :param window: number of positions searched or waiting at once (int, optional - four
+        per process)
+    :return: generator of results of analyse_line (dicts)
+    """
+    settings = {
+        "depth": depth,
+        "time": time_limit,
+        "nodes": node_limit,
+        "table_mb": table_mb,
+        "tablebase": tablebase,
+    }
+    tasks = (
+        (number, line, settings) for number, line in enumerate(lines, 1) if line.strip()
+    )
+    if workers <= 1:
+        yield from map(analyse_line, tasks)
+        return
+    if window is None:
+        window = 4 * workers
+    # the tablebase goes to every process once instead of with every position
+    settings["tablebase"] = None
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(tablebase,)
+    ) as pool:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(pool.apply_async(analyse_line, (task,)))
+            if len(pending) >= window:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
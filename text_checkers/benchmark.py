@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+
+import copy
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from Checkers import Checkers
+from State import BitboardState
+from alphabeta import alphabeta, alphabeta_in_place, SearchLimits
+from ordering import MoveOrdering
+from parallel import parallel_search
+from positions import positions, build_position
+from transposition import TranspositionTable
+
+
+def count_nodes(game, depth, iterative=False, table=None, ordering=None):
+    """
+    Helper function. Search the game and count the visited nodes.
+    :param iterative: whether to search every depth from 1 up to the given one (bool)
+    :return: tuple (number of nodes, time in seconds)
+    """
+    limits = SearchLimits()
+    start = time.perf_counter()
+    for d in range(1 if iterative else depth, depth + 1):
+        alphabeta_in_place(game, d, table=table, limits=limits, ordering=ordering)
+    return limits.nodes, time.perf_counter() - start
+
+
+class _CountingState(BitboardState):
+    """A class of BitboardState counting the children made by all its instances."""
+
+    nodes = 0
+
+    def iter_children(self):
+        for moves, child in super().iter_children():
+            type(self).nodes += 1
+            yield moves, child
+
+
+def count_bitboard_nodes(game, depth):
+    """
+    Helper function. Search the game with the bitboard engine (alphabeta of BitboardState)
+    and count the visited nodes.
+    :return: tuple (number of nodes, time in seconds)
+    """
+    _CountingState.nodes = 1
+    start = time.perf_counter()
+    alphabeta(_CountingState(game), depth)
+    return _CountingState.nodes, time.perf_counter() - start
+
+
+def random_position(width, plies, seed=0):
+    """Helper function. Position of the given width after random moves from the start."""
+    rng = random.Random(seed)
+    game = Checkers(board_arguments={"width": width})
+    for _ in range(plies):
+        if game.is_end_of_game():
+            break
+        moves = [list(_moves) for _moves in game.play_moves()]
+        for step in rng.choice(moves):
+            game.move(*step)
+        game.next_player()
+    game.history.clear()
+    return game
+
+
+def width_report(depth=5, widths=(8, 10, 12)):
+    """Print nodes per second of both engines on boards of the given widths."""
+    print(f"{'width':>5}{'position':>12}{'pieces':>8}{'in-place':>18}{'bitboard':>18}")
+    for width in widths:
+        for name, plies in (("start", 0), ("middlegame", 4 * width)):
+            game = random_position(width, plies)
+            pieces = len(game.player1.pieces) + len(game.player2.pieces)
+            speeds = []
+            for count in (count_nodes, count_bitboard_nodes):
+                nodes, elapsed = count(game, depth)
+                speeds.append(f"{nodes / elapsed:>12.0f} n/s")
+            print(f"{width:>5}{name:>12}{pieces:>8}{speeds[0]:>18}{speeds[1]:>18}")
+
+
+def ordering_report(depth=5, names=None):
+    """Print node counts of searches of the fixed positions without and with move ordering."""
+    if names is None:
+        names = list(positions)
+    print(
+        f"{'position':<30}{'unordered':>12}{'ordered':>12}{'ordered+tt+id':>16}"
+        f"{'ratio':>8}"
+    )
+    totals = [0, 0, 0]
+    for name in names:
+        game = build_position(name)
+        plain, _ = count_nodes(game, depth)
+        ordered, _ = count_nodes(game, depth, ordering=MoveOrdering())
+        deepened, _ = count_nodes(
+            game, depth, True, TranspositionTable(4), MoveOrdering()
+        )
+        for i, nodes in enumerate((plain, ordered, deepened)):
+            totals[i] += nodes
+        print(
+            f"{name:<30}{plain:>12}{ordered:>12}{deepened:>16}"
+            f"{deepened / plain:>8.2f}"
+        )
+    print(
+        f"{'total':<30}{totals[0]:>12}{totals[1]:>12}{totals[2]:>16}"
+        f"{totals[2] / totals[0]:>8.2f}"
+    )
+
+
+def memory_report(copies=200, widths=(8, 10, 12)):
+    """Print memory and time of a copy of a game, as made for each node of the search."""
+    print(f"{'width':>5}{'position':>12}{'pieces':>8}{'memory':>14}{'deepcopy':>14}")
+    for width in widths:
+        for name, plies in (("start", 0), ("middlegame", 4 * width)):
+            game = random_position(width, plies)
+            pieces = len(game.player1.pieces) + len(game.player2.pieces)
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            games = [copy.deepcopy(game) for _ in range(copies)]
+            memory = (tracemalloc.get_traced_memory()[0] - before) / copies
+            tracemalloc.stop()
+            del games
+            start = time.perf_counter()
+            for _ in range(copies):
+                copy.deepcopy(game)
+            elapsed = (time.perf_counter() - start) / copies
+            print(
+                f"{width:>5}{name:>12}{pieces:>8}{memory / 1024:>10.1f} KiB"
+                f"{elapsed * 1e6:>11.0f} us"
+            )
+
+
+def parallel_report(depth=8, names=("start", "middlegame", "endgame", "king_endgame")):
+    """Print time to depth and speedup of the parallel search with 1, 2, 4 and 8 workers."""
+    print(f"{'position':<20}{'workers':>8}{'nodes':>10}{'time [s]':>10}{'speedup':>9}")
+    for name in names:
+        single = None
+        for workers in (1, 2, 4, 8):
+            game = build_position(name)
+            start = time.perf_counter()
+            *_, nodes = parallel_search(game, workers, max_depth=depth)
+            elapsed = time.perf_counter() - start
+            if single is None:
+                single = elapsed
+            print(
+                f"{name:<20}{workers:>8}{nodes:>10}{elapsed:>10.2f}"
+                f"{single / elapsed:>9.2f}"
+            )
+
+
+def main(argv):
+    commands = {
+        "memory": memory_report,
+        "ordering": ordering_report,
+        "parallel": parallel_report,
+        "widths": width_report,
+    }
+    if len(argv) < 2 or argv[1] not in commands:
+        print(f"Usage: {argv[0]} {'|'.join(commands)} [depth|copies]")
+        return 1
+    commands[argv[1]](*(int(arg) for arg in argv[2:3]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
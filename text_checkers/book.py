@@ -0,0 +1,271 @@
+#!/usr/bin/python3
+
+import argparse
+import multiprocessing
+import struct
+import sys
+import time
+from Checkers import Checkers
+from alphabeta import iterative_deepening
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+
+class OpeningBook:
+    """
+    A class representing an opening book: moves worth playing in positions close to the
+    start of the game, found offline by deep searches (see build_book).
+
+    The file holds a header and entries sorted by the Zobrist hash of the position. An
+    entry names a move by the hash of the position after it, so multi-jump moves sharing
+    the first step are told apart. The whole book is small and is read into a dict, so a
+    lookup takes constant time.
+
+    class variables:
+        magic - first bytes of the file,
+        version - version of the file format,
+        header_format - struct format of the header: magic, version, width of the board,
+            number of entries,
+        entry_format - struct format of an entry: hash of the position, hash of the position
+            after the move, weight of the move
+
+    attributes:
+        width - width of the board (int),
+        moves - moves of every position (dict: hash -> tuple of tuples (hash after the move,
+            weight)), greater weights first
+    """
+
+    magic = b"TCOB"
+    version = 1
+    header_format = struct.Struct("<4sHHI")
+    entry_format = struct.Struct("<QQH")
+
+    def __init__(self, path):
+        cls = type(self)
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, self.width, count = cls.header_format.unpack_from(data, 0)
+        if magic != cls.magic or version != cls.version:
+            raise ValueError(
+                f"Not an opening book file of version {cls.version}: {path}"
+            )
+        moves = {}
+        for key, after, weight in cls.entry_format.iter_unpack(
+            data[cls.header_format.size :][: count * cls.entry_format.size]
+        ):
+            moves.setdefault(key, []).append((after, weight))
+        self.moves = {key: tuple(entries) for key, entries in moves.items()}
+
+    @classmethod
+    def write(cls, path, width, moves):
+        """
+        Write an opening book file.
+        :param moves: moves of every position (dict: hash -> iterable of tuples (hash after
+            the move, weight))
+        """
+        entries = sorted(
+            (key, -weight, after)
+            for key, position_moves in moves.items()
+            for after, weight in position_moves
+        )
+        with open(path, "wb") as file:
+            file.write(
+                cls.header_format.pack(cls.magic, cls.version, width, len(entries))
+            )
+            for key, weight, after in entries:
+                file.write(cls.entry_format.pack(key, after, -weight))
+
+    def probe(self, game):
+        """
+        Get the book moves of the position of the game.
+        :param game: game (class Checkers), left as it was given
+        :return: a list of tuples (steps of the move, weight), greater weights first
+        """
+        if game.board.width != self.width or game.must_continue:
+            return []
+        entries = self.moves.get(game.hash)
+        if not entries:
+            return []
+        weights = dict(entries)
+        found = []
+        for moves in game.play_moves():
+            if game.hash in weights:
+                found.append((list(moves), weights[game.hash]))
+        found.sort(key=lambda entry: -entry[1])
+        return found
+
+    def choose(self, game, rng=None):
+        """
+        Choose a book move of the position of the game.
+        :param game: game (class Checkers), left as it was given
+        :param rng: random generator choosing moves in proportion to their weights
+            (class random.Random, optional - the move of the greatest weight is chosen)
+        :return: steps of the move (a list of tuples of positions: origin, destination) or
+            None if the position is not in the book
+        """
+        found = self.probe(game)
+        if not found:
+            return None
+        if rng is None:
+            return found[0][0]
+        return rng.choices(
+            [moves for moves, _ in found], [weight for _, weight in found]
+        )[0]
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __repr__(self):
+        return f"OpeningBook({len(self)} positions)"
+
+
+def book_lines(plies, width=Checkers.default_width):
+    """
+    Get every position of the first plies of the game, walked breadth-first so every
+    position is reached by its shortest line.
+    :param plies: number of moves from the start (int)
+    :param width: width of the board (int)
+    :return: a list of lines (lists of moves) leading to the positions, one per position
+    """
+    game = Checkers(board_arguments={"width": width})
+    lines = {game.hash: []}
+    level = [[]]
+    for _ in range(plies - 1):
+        next_level = []
+        for line in level:
+            played = _play_line(game, line)
+            for moves in game.play_moves():
+                if game.hash not in lines and not game.is_end_of_game():
+                    lines[game.hash] = line + [list(moves)]
+                    next_level.append(lines[game.hash])
+            for _ in range(played):
+                game.undo()
+        level = next_level
+    return list(lines.values())
+
+
+def _play_line(game, line):
+    """Function used internally. Play the line, return the number of undo records."""
+    for moves in line:
+        for step in moves:
+            game.move(*step)
+        game.next_player()
+    return sum(len(moves) + 1 for moves in line)
+
+
+def analyse_line(task):
+    """
+    Search every move of the position after the line.
+    :param task: tuple (line - a list of moves, settings - dict of arguments of build_book)
+    :return: tuple (hash of the position, a list of tuples (hash after the move, weight))
+    """
+    line, settings = task
+    game = Checkers(board_arguments={"width": settings["width"]})
+    _play_line(game, line)
+    game.history.clear()
+    key = game.hash
+    sign = 1 if game.current_player == game.player1 else -1
+    table = TranspositionTable(settings["table_mb"])
+    ordering = MoveOrdering()
+    scores = []
+    for _ in game.play_moves():
+        score, _, _ = iterative_deepening(
+            game,
+            max_depth=settings["depth"] - 1,
+            time_limit=settings["time"],
+            table=table,
+            ordering=ordering,
+        )
+        scores.append((game.hash, sign * score))
+    best = max(score for _, score in scores)
+    margin = settings["margin"]
+    return key, [
+        (after, min(0xFFFF, 1 + round(margin - (best - score))))
+        for after, score in scores
+        if best - score <= margin
+    ]
+
+
+def build_book(
+    path,
+    plies=4,
+    depth=6,
+    time_limit=None,
+    margin=0,
+    workers=None,
+    width=Checkers.default_width,
+    table_mb=4,
+    out=None,
+):
+    """
+    Search every position of the first plies of the game in a pool of processes and write
+    the best moves into an opening book file.
+    :param path: path of the book file (str)
+    :param plies: number of moves from the start covered by the book (int)
+    :param depth: depth of the search of a position, at least 2 (int)
+    :param time_limit: time budget of the search of every move in seconds (float, optional)
+    :param margin: moves scoring at most margin below the best are kept too, with smaller
+        weights (number)
+    :param workers: number of processes (int, optional - number of CPUs)
+    :param out: stream for progress messages (optional)
+    :return: number of positions of the book (int)
+    """
+    if depth < 2:
+        raise ValueError("Opening book searches need a depth of at least 2.")
+    settings = {
+        "depth": depth,
+        "time": time_limit,
+        "margin": margin,
+        "width": width,
+        "table_mb": table_mb,
+    }
+    lines = book_lines(plies, width)
+    moves = {}
+    with multiprocessing.Pool(workers) as pool:
+        tasks = ((line, settings) for line in lines)
+        for key, position_moves in pool.imap_unordered(analyse_line, tasks):
+            moves[key] = position_moves
+            if out is not None and len(moves) % 50 == 0:
+                print(f"{len(moves)} of {len(lines)} positions", file=out)
+    OpeningBook.write(path, width, moves)
+    return len(moves)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build an opening book by searching the first moves of the game."
+    )
+    parser.add_argument("--output", default="openings.book", help="path of the file")
+    parser.add_argument(
+        "--plies", type=int, default=4, help="number of moves from the start"
+    )
+    parser.add_argument("--depth", type=int, default=6, help="depth of the searches")
+    parser.add_argument("--time", type=float, default=None, help="time per move [s]")
+    parser.add_argument(
+        "--margin", type=float, default=0, help="keep moves this much below the best"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="number of processes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    start = time.perf_counter()
+    positions = build_book(
+        arguments.output,
+        arguments.plies,
+        arguments.depth,
+        arguments.time,
+        arguments.margin,
+        arguments.workers,
+        out=sys.stdout,
+    )
+    print(
+        f"{arguments.output}: {positions} positions in "
+        f"{time.perf_counter() - start:.1f} s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
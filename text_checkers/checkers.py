@@ -1,6 +1,8 @@
 from components import *
 from exceptions import *
+from evaluation import Evaluation
 import copy
+import random
 
 
 class Checkers:
@@ -9,8 +11,10 @@ class Checkers:
 
     class variables:
         default_width - default width of the board,
-        pieces_per_player - number of pieces for each player,
-        draw_amount - number of rounds with non-attacking king moves before draw
+        pieces_per_player - number of pieces for each player (None - derived from the width
+            of the board, see pieces_for_width),
+        draw_amount - number of rounds with non-attacking king moves before draw,
+        directions - diagonal directions (row, column), in the order of get_directions
 
     attributes:
         board - board of cells (class Board),
@@ -20,12 +24,23 @@ class Checkers:
         winner - winner of the game (None or class Player),
         king_moves_since_last_attack - used in draw checking (int),
         blocked_cells - a set of cells removed in the current round (set of tuples (int row, int col),
-        must_continue - whether a player must continue his move (bool)
+        must_continue - whether a player must continue his move (bool),
+        history - undo records of moves and player changes, the last one on top (list),
+        hash - Zobrist hash of the pieces and the player to move, kept up to date by move,
+            remove_piece, set_king and next_player (int),
+        evaluation - weights of the evaluation of positions (class Evaluation),
+        value - evaluation of the position for player1, kept up to date like hash (number),
+        _movable - for each player the piece found by the last can_move, checked first as it
+            most likely still can move (list of two: None or class Piece)
     """
 
     default_width = 8
-    pieces_per_player = 12
+    pieces_per_player = None
     draw_amount = 15
+    directions = ((-1, -1), (-1, 1), (1, 1), (1, -1))
+
+    _zobrist = {}
+    _geometry = {}
 
     def __init__(
         self,
@@ -34,6 +49,7 @@ class Checkers:
         player_arguments=({}, {}),
         board_arguments=None,
         arrange_pieces=True,
+        evaluation=None,
     ):
         if board_arguments is None:
             board_arguments = {}
@@ -48,6 +64,11 @@ class Checkers:
         self.king_moves_since_last_attack = 0
         self.blocked_cells = set()
         self.must_continue = False
+        self.history = []
+        self.hash = 0
+        self.evaluation = Evaluation() if evaluation is None else evaluation
+        self.value = 0
+        self._movable = [None, None]
         if init_board:
             if len(board_arguments) == 0:
                 self.board = Board(width=type(self).default_width)
@@ -63,11 +84,145 @@ class Checkers:
                     )
                 else:
                     self.board = Board(**board_arguments)
+            self.board.players = (self.player1, self.player2)
             if arrange_pieces:
                 self.arrange_pieces()
         else:
             self.board = None
 
+    @classmethod
+    def zobrist_keys(cls, width):
+        """
+        Get random keys of Zobrist hashing for the board of the given width. The keys are
+        the same in every process.
+        :param width: width of the board (int)
+        :return: tuple: keys of squares (for every square numbered row * width + col a tuple
+            of keys of player1 man, player1 king, player2 man, player2 king), key of player2
+            to move
+        """
+        if width not in cls._zobrist:
+            rng = random.Random(width)
+            keys = tuple(
+                tuple(rng.getrandbits(64) for kind in range(4))
+                for square in range(width * width)
+            )
+            cls._zobrist[width] = keys, rng.getrandbits(64)
+        return cls._zobrist[width]
+
+    @classmethod
+    def pieces_for_width(cls, width):
+        """
+        Get the number of pieces of each player at the start of the game: pieces_per_player
+        if it is set, otherwise the pieces fill all rows but the two in the middle (12 on the
+        8x8 board, 20 on 10x10, 30 on 12x12).
+        :param width: width of the board (int)
+        :return: int
+        """
+        if cls.pieces_per_player is not None:
+            return cls.pieces_per_player
+        return (width - 2) // 2 * (width // 2)
+
+    @classmethod
+    def geometry(cls, width):
+        """
+        Get tables describing the board of the given width (built once per width), used by
+        the move generation instead of bounds checks.
+        :param width: width of the board (int)
+        :return: tuple: rays (rays[row][col] is a tuple of four rays, one per direction, a
+            ray is a tuple of positions up to the edge of the board), jumps (jumps[row][col]
+            is a tuple of pairs of positions: jumped over, landing), forward directions of
+            each player (indices into directions, player1 first), promotion rows of each
+            player
+        """
+        if width not in cls._geometry:
+            rays = []
+            jumps = []
+            for row in range(width):
+                row_rays = []
+                row_jumps = []
+                for col in range(width):
+                    square_rays = []
+                    for d_row, d_col in cls.directions:
+                        ray = []
+                        r, c = row + d_row, col + d_col
+                        while 0 <= r < width and 0 <= c < width:
+                            ray.append((r, c))
+                            r, c = r + d_row, c + d_col
+                        square_rays.append(tuple(ray))
+                    row_rays.append(tuple(square_rays))
+                    row_jumps.append(
+                        tuple((ray[0], ray[1]) for ray in square_rays if len(ray) > 1)
+                    )
+                rays.append(tuple(row_rays))
+                jumps.append(tuple(row_jumps))
+            cls._geometry[width] = (
+                tuple(rays),
+                tuple(jumps),
+                ((3, 2), (1, 0)),
+                (width - 1, 0),
+            )
+        return cls._geometry[width]
+
+    def piece_key(self, place, piece):
+        """
+        Get the Zobrist key of the piece standing in place.
+        :param place: position (tuple of coordinates - row, column)
+        :param piece: piece (class Piece)
+        :return: int
+        """
+        row, col = place
+        keys, _ = type(self).zobrist_keys(self.board.width)
+        kind = (0 if piece.parent == self.player1 else 2) + piece.is_king()
+        return keys[row * self.board.width + col][kind]
+
+    def compute_hash(self):
+        """
+        Compute the Zobrist hash of the position from scratch (for pieces put on the board
+        directly).
+        :return: int
+        """
+        value = 0
+        width = self.board.width
+        for square, piece in enumerate(self.board.pieces):
+            if piece is not None:
+                value ^= self.piece_key(divmod(square, width), piece)
+        if self.current_player is not None and self.current_player == self.player2:
+            value ^= type(self).zobrist_keys(self.board.width)[1]
+        return value
+
+    def piece_value(self, place, piece):
+        """
+        Get the value of the piece standing in place for player1.
+        :param place: position (tuple of coordinates - row, column)
+        :param piece: piece (class Piece)
+        :return: number
+        """
+        row, col = place
+        tables = self.evaluation.tables(self.board.width)
+        kind = (0 if piece.parent == self.player1 else 2) + piece.is_king()
+        return tables[kind][row * self.board.width + col]
+
+    def compute_value(self):
+        """
+        Compute the evaluation of the position from scratch (for pieces put on the board
+        directly).
+        :return: number
+        """
+        value = 0
+        width = self.board.width
+        for square, piece in enumerate(self.board.pieces):
+            if piece is not None:
+                value += self.piece_value(divmod(square, width), piece)
+        return value
+
+    def set_evaluation(self, evaluation):
+        """
+        Change weights of the evaluation.
+        :param evaluation: class Evaluation
+        """
+        self.evaluation = evaluation
+        self.value = self.compute_value()
+
     @staticmethod
     def is_jump(orig, dest):
         return abs(orig[0] - dest[0]) > 1
@@ -90,16 +245,22 @@ class Checkers:
 
     def next_player(self):
         assert not self.must_continue, "Current player must continue his moves."
+        self.history.append(
+            (None, self.blocked_cells, self.winner, self.current_player, self.hash)
+        )
+        width = self.board.width
+        squares = self.board.squares
         for row, col in self.blocked_cells:
-            self.board[row][col].unblock()
-        self.blocked_cells.clear()
+            squares[row * width + col] &= ~BLOCKED
+        self.blocked_cells = set()
         self.calculate_winner()
         self.current_player = self.other_player(self.current_player)
+        self.hash ^= type(self).zobrist_keys(self.board.width)[1]
 
     def arrange_pieces(self):
         self.player1.pieces.clear()
         self.player2.pieces.clear()
-        for p in range(type(self).pieces_per_player):
+        for p in range(type(self).pieces_for_width(self.board.width)):
             row = (2 * p) // self.board.width
             while row >= self.board.width:
                 row -= 1
@@ -108,14 +269,14 @@ class Checkers:
             else:
                 col = (2 * p) % self.board.width
 
-            piece = self.board.cells[row][col].piece = Piece(self.player1)
-            self.player1.pieces.add(piece)
+            self.put_piece((row, col), Piece(self.player1))
 
             row = self.board.width - row - 1
             col = self.board.width - col - 1
 
-            piece = self.board.cells[row][col].piece = Piece(self.player2)
-            self.player2.pieces.add(piece)
+            self.put_piece((row, col), Piece(self.player2))
+        self.hash = self.compute_hash()
+        self.value = self.compute_value()
 
     def is_end_of_game(self):
         if self.king_moves_since_last_attack > self.draw_amount:
@@ -127,24 +288,10 @@ class Checkers:
     def get_score(self, player=None):
         if player is None:
             player = self.current_player
-        val = 0
-
-        for piece in self.player1.pieces:
-            if piece.is_king():
-                val += 2
-            else:
-                val += 1
-
-        for piece in self.player2.pieces:
-            if piece.is_king():
-                val -= 2
-            else:
-                val -= 1
-
         if player == self.player1:
-            return val
+            return self.value
         else:
-            return -val
+            return -self.value
 
     def calculate_winner(self):
         other_player = self.other_player(self.current_player)
@@ -156,56 +303,126 @@ class Checkers:
             self.winner = other_player
             return
         # check if any player is blocked
-        can_move = False
-        for i, row in enumerate(self.board):
-            for j, cell in enumerate(row):
-                if cell.piece in other_player.pieces:
-                    if len(self.possible_moves((i, j))):
-                        can_move = True
-                        break
-            if can_move:
-                break
-        if not can_move:
+        if not self.can_move(other_player):
             self.winner = self.current_player
-        can_move = False
-        for i, row in enumerate(self.board):
-            for j, cell in enumerate(row):
-                if cell.piece in self.current_player.pieces:
-                    if len(self.possible_moves((i, j))):
-                        can_move = True
-                        break
-            if can_move:
-                break
-        if not can_move:
+        if not self.can_move(self.current_player):
             self.winner = other_player
 
+    def can_move(self, player):
+        """
+        Whether any piece of the player has a possible move. Stops at the first piece which
+        can move, starting with the one found the last time.
+        :param player: player of the game
+        :return: bool
+        """
+        pieces = player.pieces
+        side = 0 if player == self.player1 else 1
+        piece = self._movable[side]
+        if piece in pieces and self.has_moves(pieces[piece]):
+            return True
+        for piece, place in pieces.items():
+            if self.has_moves(place):
+                self._movable[side] = piece
+                return True
+        return False
+
+    def has_moves(self, place):
+        """
+        Whether the piece in the given position has a possible move, the same as
+        len(self.possible_moves(place)) > 0 but without searching the depth of attacks.
+        :param place: position (tuple of coordinates - row, column)
+        :return: bool
+        """
+        row, col = place
+        width = self.board.width
+        squares = self.board.squares
+        code = squares[row * width + col]
+        rays, jumps, forward, _ = type(self).geometry(width)
+        if code & KING:
+            # a king attack lands on a cell the king could also move to
+            for ray in rays[row][col]:
+                for r, c in ray:
+                    state = squares[r * width + c]
+                    if state & BLOCKED:
+                        break
+                    if not state & OWNER:
+                        return True
+            return False
+        square_rays = rays[row][col]
+        for direction in forward[0 if code & PLAYER1 else 1]:
+            ray = square_rays[direction]
+            if ray and not squares[ray[0][0] * width + ray[0][1]] & OWNER:
+                return True
+        enemy = OWNER ^ (code & OWNER)
+        for (r, c), (landing_row, landing_col) in jumps[row][col]:
+            if (
+                squares[r * width + c] & enemy
+                and not squares[landing_row * width + landing_col] & OWNER
+            ):
+                return True
+        return False
+
     def remove_piece(self, piece):
         if isinstance(piece, Piece):
             for player in (self.player1, self.player2):
                 if piece in player.pieces:
-                    player.pieces.remove(piece)
-            for row, row_of_pieces in enumerate(self.board):
-                for col, cell in enumerate(row_of_pieces):
-                    if cell.piece == piece:
-                        self.blocked_cells.add((row, col))
-                        cell.block()
+                    self.remove_piece(player.pieces[piece])
+                    return
+            self.board.remove_piece(piece)
+            return
         elif isinstance(piece, tuple):
             assert len(piece) == 2, f"Wrong piece tuple: {piece}"
             row = piece[0]
             col = piece[1]
             assert self.board.in_bounds(row, col)
             self.blocked_cells.add((row, col))
-            self.board[row][col].block()
-            cell = self.board[row][col]
-            if cell.has_piece():
+            index = row * self.board.width + col
+            self.board.squares[index] |= BLOCKED
+            removed = self.board.pieces[index]
+            if removed is not None:
+                self.hash ^= self.piece_key(piece, removed)
+                self.value -= self.piece_value(piece, removed)
                 for player in (self.player1, self.player2):
-                    if cell.piece in player.pieces:
-                        player.pieces.remove(cell.piece)
+                    if removed in player.pieces:
+                        del player.pieces[removed]
         self.board.remove_piece(piece)
 
+    def set_king(self, place):
+        """
+        Promote the piece in place to king.
+        :param place: position (tuple of coordinates - row, column)
+        """
+        row, col = place
+        index = row * self.board.width + col
+        piece = self.board.pieces[index]
+        if not piece.is_king():
+            self.hash ^= self.piece_key(place, piece)
+            self.value -= self.piece_value(place, piece)
+            piece.set_king()
+            self.board.squares[index] |= KING
+            self.hash ^= self.piece_key(place, piece)
+            self.value += self.piece_value(place, piece)
+
+    def put_piece(self, place, piece):
+        """
+        Put the piece on the empty cell in place, keeping the pieces of its player, the hash
+        and the value up to date.
+        :param place: position (tuple of coordinates - row, column)
+        :param piece: piece (class Piece)
+        """
+        row, col = place
+        index = row * self.board.width + col
+        assert (
+            not self.board.squares[index] & OWNER
+        ), f"{place}: Cannot put into non-empty cell."
+        self.board.set_piece(index, piece)
+        piece.parent.pieces[piece] = place
+        self.hash ^= self.piece_key(place, piece)
+        self.value += self.piece_value(place, piece)
+
     def get_directions(self, player, all_directions):
         if all_directions:
-            return ((-1, -1), (-1, 1), (1, 1), (1, -1))
+            return type(self).directions
         if player == self.player1:
             return ((1, -1), (1, 1))
         return ((-1, 1), (-1, -1))
@@ -221,32 +438,51 @@ class Checkers:
         assert self.board.in_bounds(*dest)
         row, col = orig
         dest_row, dest_col = dest
-        cell = self.board[row][col]
-        assert cell.has_piece(), f"{orig} -> {dest}: Cannot move empty cell."
-        assert self.board[dest_row][
-            dest_col
-        ].is_empty(), f"{orig} -> {dest}: Cannot move into non-empty cell."
+        width = self.board.width
+        orig_index = row * width + col
+        dest_index = dest_row * width + dest_col
+        piece = self.board.pieces[orig_index]
+        assert piece is not None, f"{orig} -> {dest}: Cannot move empty cell."
+        assert (
+            not self.board.squares[dest_index] & OWNER
+        ), f"{orig} -> {dest}: Cannot move into non-empty cell."
         is_attack = False
+        # undo record: orig, dest, captured pieces, promotion, previous counters, hash and value
+        record = [
+            orig,
+            dest,
+            [],
+            False,
+            self.king_moves_since_last_attack,
+            self.must_continue,
+            self.winner,
+            self.hash,
+            self.value,
+        ]
+        self.history.append(record)
         if self.is_jump(orig, dest):
-            player = self.board.cells[row][col].piece.parent
-            enemies = self.enemies_between(orig, dest, player)
-            if cell.piece.is_king() and len(enemies) == 0:
+            enemies = self.enemies_between(orig, dest, piece.parent)
+            if piece.is_king() and len(enemies) == 0:
                 self.king_moves_since_last_attack += 1
             else:
                 self.king_moves_since_last_attack = 0
             for enemy in enemies:
                 is_attack = True
+                record[2].append(
+                    (enemy, self.board.pieces[enemy[0] * width + enemy[1]])
+                )
                 self.remove_piece(enemy)
-        self.board[row][col], self.board[dest_row][dest_col] = (
-            self.board[dest_row][dest_col],
-            self.board[row][col],
-        )
-        if (cell.piece.parent != self.player1 and dest_row == 0) or (
-            cell.piece.parent == self.player1 and dest_row == self.board.width - 1
+        self.hash ^= self.piece_key(orig, piece) ^ self.piece_key(dest, piece)
+        self.value += self.piece_value(dest, piece) - self.piece_value(orig, piece)
+        self.board.swap(orig_index, dest_index)
+        piece.parent.pieces[piece] = dest
+        if (piece.parent != self.player1 and dest_row == 0) or (
+            piece.parent == self.player1 and dest_row == width - 1
         ):
-            if not cell.piece.is_king():
+            if not piece.is_king():
                 if not self.can_attack(dest):
-                    cell.piece.set_king()
+                    self.set_king(dest)
+                    record[3] = True
                     self.must_continue = False
                 else:
                     self.must_continue = True
@@ -259,6 +495,195 @@ class Checkers:
         self.calculate_winner()
         return self.must_continue
 
+    def undo(self):
+        """
+        Take back the last move (a single step of a multi-jump) or the last change of the
+        player, restoring captured pieces, blocked cells, promotion and counters.
+        """
+        record = self.history.pop()
+        if record[0] is None:
+            _, blocked_cells, self.winner, self.current_player, self.hash = record
+            width = self.board.width
+            squares = self.board.squares
+            for row, col in blocked_cells:
+                squares[row * width + col] |= BLOCKED
+            self.blocked_cells = blocked_cells
+            return
+        (
+            orig,
+            dest,
+            captured,
+            promoted,
+            self.king_moves_since_last_attack,
+            self.must_continue,
+            self.winner,
+            self.hash,
+            self.value,
+        ) = record
+        board = self.board
+        width = board.width
+        orig_index = orig[0] * width + orig[1]
+        board.swap(orig_index, dest[0] * width + dest[1])
+        piece = board.pieces[orig_index]
+        piece.parent.pieces[piece] = orig
+        if promoted:
+            piece.unset_king()
+            board.squares[orig_index] &= ~KING
+        for place, piece in captured:
+            index = place[0] * width + place[1]
+            board.squares[index] &= ~BLOCKED
+            board.set_piece(index, piece)
+            piece.parent.pieces[piece] = place
+            self.blocked_cells.discard(place)
+
+    def play_moves(self, first=None, key=None):
+        """
+        Play every complete move of the current player in this round, one after another,
+        on this game (without copies). A multi-jump sequence is a single move. After each
+        yield the game holds the position after the move with the player switched; the move
+        is taken back when the generator is resumed or closed.
+        :param first: step played before the others (tuple of positions: origin, destination)
+        :param key: function ranking moves (class MovePath), greater ranks are played first
+            (optional)
+        :return: generator of lists of steps of the move
+        """
+        paths = self.move_paths()
+        if key is not None:
+            paths.sort(key=key, reverse=True)
+        if first is not None:
+            paths.sort(key=lambda path: path.steps[0] != first)
+        for path in paths:
+            self.apply_path(path)
+            self.next_player()
+            try:
+                yield path.steps
+            finally:
+                self.undo()
+                self.undo()
+
+    def move_paths(self):
+        """
+        Get every complete move of the current player in this round. Multi-jump sequences
+        are built in a single depth-first pass, lifting and restoring the pieces on the board
+        without copies, history records or checks of the winner after every jump.
+        :return: a list of moves (class MovePath)
+        """
+        paths = []
+        for orig, dest in self.get_possible_moves(self.current_player):
+            self._extend_path(orig, dest, [], 0, False, paths)
+        return paths
+
+    def _extend_path(self, orig, dest, steps, captured, blocks_opponent, paths):
+        """
+        Function used internally. Make the step on the board as move does, add every
+        complete move continuing it to paths and take the step back.
+        :param steps: steps made before (list, restored on return)
+        :param captured: squares of pieces captured before (int bitmask)
+        :param blocks_opponent: whether the opponent could not move after an earlier step
+        :param paths: list of found moves (class MovePath)
+        """
+        board = self.board
+        width = board.width
+        squares = board.squares
+        dest_row = dest[0]
+        orig_index = orig[0] * width + orig[1]
+        dest_index = dest_row * width + dest[1]
+        piece = board.pieces[orig_index]
+        player = piece.parent
+        enemies = []
+        if self.is_jump(orig, dest):
+            enemies = [
+                (place, board.pieces[place[0] * width + place[1]])
+                for place in self.enemies_between(orig, dest, player)
+            ]
+        for place, enemy in enemies:
+            del enemy.parent.pieces[enemy]
+            index = place[0] * width + place[1]
+            board.set_piece(index, None)
+            squares[index] |= BLOCKED
+            self.blocked_cells.add(place)
+            captured |= 1 << index
+        board.swap(orig_index, dest_index)
+        player.pieces[piece] = dest
+        steps.append((orig, dest))
+        try:
+            promotion = not piece.is_king() and dest_row == (
+                width - 1 if player == self.player1 else 0
+            )
+            attacks = []
+            if enemies or promotion:
+                attacks = self.possible_attacks(dest, player)
+            if attacks:
+                # move checks the winner after every jump, the opponent loses when it
+                # cannot move in the middle of the sequence
+                blocks_opponent = blocks_opponent or not self.can_move(
+                    self.other_player(player)
+                )
+                for next_dest in attacks:
+                    self._extend_path(
+                        dest, next_dest, steps, captured, blocks_opponent, paths
+                    )
+            else:
+                paths.append(
+                    MovePath(list(steps), captured, promotion, blocks_opponent)
+                )
+        finally:
+            steps.pop()
+            board.swap(orig_index, dest_index)
+            player.pieces[piece] = orig
+            for place, enemy in enemies:
+                index = place[0] * width + place[1]
+                squares[index] &= ~BLOCKED
+                board.set_piece(index, enemy)
+                enemy.parent.pieces[enemy] = place
+                self.blocked_cells.discard(place)
+
+    def apply_path(self, path):
+        """
+        Make a complete move at once, with the same result as making its steps with move
+        one after another. A single undo takes it back.
+        :param path: move of the current player (class MovePath from move_paths)
+        """
+        orig, dest = path.steps[0][0], path.steps[-1][1]
+        width = self.board.width
+        orig_index = orig[0] * width + orig[1]
+        dest_index = dest[0] * width + dest[1]
+        piece = self.board.pieces[orig_index]
+        # the same undo record as of move, from the origin to the last destination
+        record = [
+            orig,
+            dest,
+            [],
+            False,
+            self.king_moves_since_last_attack,
+            self.must_continue,
+            self.winner,
+            self.hash,
+            self.value,
+        ]
+        self.history.append(record)
+        if path.captured:
+            self.king_moves_since_last_attack = 0
+            captured = path.captured
+            while captured:
+                square = (captured & -captured).bit_length() - 1
+                captured &= captured - 1
+                record[2].append((divmod(square, width), self.board.pieces[square]))
+                self.remove_piece(divmod(square, width))
+        elif self.is_jump(orig, dest) and piece.is_king():
+            self.king_moves_since_last_attack += 1
+        self.hash ^= self.piece_key(orig, piece) ^ self.piece_key(dest, piece)
+        self.value += self.piece_value(dest, piece) - self.piece_value(orig, piece)
+        self.board.swap(orig_index, dest_index)
+        piece.parent.pieces[piece] = dest
+        if path.promotion:
+            self.set_king(dest)
+            record[3] = True
+        self.must_continue = False
+        if path.blocks_opponent:
+            self.winner = self.current_player
+        self.calculate_winner()
+
     def enemies_between(self, orig, dest, player):
         """
         Get a list of enemies between given cells
@@ -268,12 +693,14 @@ class Checkers:
         :return: a list of positions of enemies (tuples of coordinates - row, column)
         """
         row, col = orig
+        width = self.board.width
+        squares = self.board.squares
+        enemy = PLAYER2 if player == self.player1 else PLAYER1
         direction = self.direction(orig, dest)
         temp_row, temp_col = row + direction[0], col + direction[1]
         enemies = []
         while (temp_row, temp_col) != dest:
-            cell = self.board[temp_row][temp_col]
-            if cell.has_piece() and cell.piece.parent != player:
+            if squares[temp_row * width + temp_col] & enemy:
                 enemies.append((temp_row, temp_col))
             temp_row, temp_col = temp_row + direction[0], temp_col + direction[1]
         return enemies
@@ -286,9 +713,9 @@ class Checkers:
         """
         row, col = place
         assert self.board.in_bounds(row, col)
-        if not self.board[row][col].has_piece():
+        piece = self.board.pieces[row * self.board.width + col]
+        if piece is None:
             raise WrongPositionException(place)
-        piece = self.board[row][col].piece
         player = piece.parent
         if piece.is_king():
             attacks = self.possible_king_attacks(place, player)
@@ -308,15 +735,15 @@ class Checkers:
         :return: a list of destination positions (tuples of coordinates - row, column)
         """
         row, col = place
-        directions = self.get_directions(player, False)
+        width = self.board.width
+        squares = self.board.squares
+        rays, _, forward, _ = type(self).geometry(width)
+        square_rays = rays[row][col]
         moves = []
-        for direction in directions:
-            new_row, new_col = row + direction[0], col + direction[1]
-            if not self.board.in_bounds(new_row, new_col):
-                continue
-            cell = self.board[new_row][new_col]
-            if cell.is_empty():
-                moves.append((new_row, new_col))
+        for direction in forward[0 if player == self.player1 else 1]:
+            ray = square_rays[direction]
+            if ray and not squares[ray[0][0] * width + ray[0][1]] & OWNER:
+                moves.append(ray[0])
         return moves
 
     def possible_king_moves(self, place, player):
@@ -327,19 +754,16 @@ class Checkers:
         :return: a list of destination positions (tuples of coordinates - row, column)
         """
         row, col = place
-        directions = self.get_directions(player, True)
+        width = self.board.width
+        squares = self.board.squares
         moves = []
-        for direction in directions:
-            new_row, new_col = row, col
-            while True:
-                new_row, new_col = new_row + direction[0], new_col + direction[1]
-                if not self.board.in_bounds(new_row, new_col):
-                    break
-                cell = self.board[new_row][new_col]
-                if cell.is_blocked():
+        for ray in type(self).geometry(width)[0][row][col]:
+            for new_place in ray:
+                state = squares[new_place[0] * width + new_place[1]]
+                if state & BLOCKED:
                     break
-                if cell.is_empty():
-                    moves.append((new_row, new_col))
+                if not state & OWNER:
+                    moves.append(new_place)
         return moves
 
     def can_attack(self, place, player=None):
@@ -351,7 +775,7 @@ class Checkers:
         """
         if player is None:
             row, col = place
-            if self.board[row][col].piece in self.player1.pieces:
+            if self.board.pieces[row * self.board.width + col] in self.player1.pieces:
                 player = self.player1
             else:
                 player = self.player2
@@ -365,13 +789,14 @@ class Checkers:
         :return: a list of destination positions (tuples of coordinates - row, column)
         """
         row, col = place
+        index = row * self.board.width + col
         if player is None:
-            if self.board[row][col].piece in self.player1.pieces:
+            if self.board.pieces[index] in self.player1.pieces:
                 player = self.player1
             else:
                 player = self.player2
 
-        if self.board[row][col].piece.is_king():
+        if self.board.squares[index] & KING:
             return self.possible_king_attacks(place, player)
         else:
             return self.possible_normal_attacks(place, player)
@@ -384,38 +809,24 @@ class Checkers:
         :return: a list of destination positions (tuples of coordinates - row, column)
         """
         row, col = place
-        directions = self.get_directions(player, True)
+        width = self.board.width
+        squares = self.board.squares
+        enemy = PLAYER2 if player == self.player1 else PLAYER1
         attacks = []
         max_depth = 0
-        for direction in directions:
-            new_row, new_col = row, col
-            is_attack = False
-            while True:
-                new_row, new_col = new_row + direction[0], new_col + direction[1]
-                if not self.board.in_bounds(new_row, new_col):
-                    break
-                cell = self.board[new_row][new_col]
-                if not is_attack:
-                    if cell.is_empty() or cell.piece.parent == player:
-                        break
-                    else:
-                        is_attack = True
-                elif cell.is_empty():
-                    ignored = set()
-                    if row == 0 or row == self.board.width:
-                        attacks.append((new_row, new_col))
-                        break
-                    d = self._normal_attack_depth(
-                        (new_row, new_col), player, 0, ignored
-                    )
-                    if d > max_depth:
-                        attacks = [(new_row, new_col)]
-                        max_depth = d
-                    elif d == max_depth:
-                        attacks.append((new_row, new_col))
-                    break
-                else:
-                    break
+        for (r, c), landing in type(self).geometry(width)[1][row][col]:
+            if not squares[r * width + c] & enemy:
+                continue
+            if not squares[landing[0] * width + landing[1]] & OWNER:
+                if row == 0 or row == width:
+                    attacks.append(landing)
+                    continue
+                d = self._normal_attack_depth(landing, player, 0, set())
+                if d > max_depth:
+                    attacks = [landing]
+                    max_depth = d
+                elif d == max_depth:
+                    attacks.append(landing)
         return attacks
 
     def _normal_attack_depth(self, place, player, depth, ignored):
@@ -428,30 +839,28 @@ class Checkers:
         :return: maximum depth of the attack
         """
         row, col = place
-        directions = self.get_directions(player, True)
+        width = self.board.width
+        squares = self.board.squares
+        enemy = PLAYER2 if player == self.player1 else PLAYER1
         max_depth = depth
-        for direction in directions:
-            new_row, new_col = row, col
+        for ray in type(self).geometry(width)[0][row][col]:
             is_attack = False
-            while True:
-                new_row, new_col = new_row + direction[0], new_col + direction[1]
-                if not self.board.in_bounds(new_row, new_col):
+            for i, new_place in enumerate(ray):
+                if new_place in ignored:
                     break
-                if (new_row, new_col) in ignored:
-                    break
-                cell = self.board[new_row][new_col]
-                if cell.is_blocked():
+                state = squares[new_place[0] * width + new_place[1]]
+                if state & BLOCKED:
                     break
                 if not is_attack:
-                    if cell.is_empty() or cell.piece.parent == player:
+                    if not state & enemy:
                         break
                     else:
                         is_attack = True
-                elif cell.is_empty():
+                elif not state & OWNER:
                     copied_ignored = copy.copy(ignored)
-                    copied_ignored.add((new_row - direction[0], new_col - direction[1]))
+                    copied_ignored.add(ray[i - 1])
                     d = self._normal_attack_depth(
-                        (new_row, new_col), player, depth + 1, copied_ignored
+                        new_place, player, depth + 1, copied_ignored
                     )
                     max_depth = max(max_depth, d)
                 else:
@@ -466,42 +875,40 @@ class Checkers:
         :return: a list of destination positions (tuples of coordinates - row, column)
         """
         row, col = place
-        directions = self.get_directions(player, True)
+        width = self.board.width
+        squares = self.board.squares
+        enemy = PLAYER2 if player == self.player1 else PLAYER1
         attacks = []
         max_depth = 0
         blocked = False
-        for direction in directions:
-            new_row, new_col = row, col
+        for ray in type(self).geometry(width)[0][row][col]:
             is_attack = False
             attacked_pieces = set()
-            while True:
-                new_row, new_col = new_row + direction[0], new_col + direction[1]
-                if not self.board.in_bounds(new_row, new_col):
-                    break
-                cell = self.board[new_row][new_col]
-                if cell.is_blocked():
+            for new_place in ray:
+                state = squares[new_place[0] * width + new_place[1]]
+                if state & BLOCKED:
                     break
                 if not is_attack:
-                    if cell.has_piece():
-                        if cell.piece.parent == player:
+                    if state & OWNER:
+                        if not state & enemy:
                             break
                         else:
-                            attacked_pieces.add((new_row, new_col))
+                            attacked_pieces.add(new_place)
                             is_attack = True
                             blocked = True
-                elif cell.has_piece():
-                    if cell.piece.parent == player or blocked:
+                elif state & OWNER:
+                    if not state & enemy or blocked:
                         break
-                    attacked_pieces.add((new_row, new_col))
+                    attacked_pieces.add(new_place)
                 else:
                     blocked = False
                     ignored = copy.copy(attacked_pieces)
-                    d = self._king_attack_depth((new_row, new_col), player, 0, ignored)
+                    d = self._king_attack_depth(new_place, player, 0, ignored)
                     if d > max_depth:
                         max_depth = d
-                        attacks = [(new_row, new_col)]
+                        attacks = [new_place]
                     elif d == max_depth:
-                        attacks.append((new_row, new_col))
+                        attacks.append(new_place)
         return attacks
 
     def _king_attack_depth(self, place, player, depth, ignored):
@@ -514,34 +921,28 @@ class Checkers:
         :return: maximum depth of the attack
         """
         row, col = place
-        directions = self.get_directions(player, True)
+        width = self.board.width
+        squares = self.board.squares
+        enemy = PLAYER2 if player == self.player1 else PLAYER1
+        blocked_cells = self.blocked_cells
         max_depth = depth
-        for direction in directions:
-            new_row, new_col = row, col
-            is_attack = False
+        for ray in type(self).geometry(width)[0][row][col]:
             attacked_piece = None
-            while True:
-                new_row, new_col = new_row + direction[0], new_col + direction[1]
-                if not self.board.in_bounds(new_row, new_col):
+            for new_place in ray:
+                if new_place in ignored or new_place in blocked_cells:
                     break
-                if (new_row, new_col) in ignored or (
-                    new_row,
-                    new_col,
-                ) in self.blocked_cells:
-                    break
-                cell = self.board[new_row][new_col]
-                if not is_attack:
-                    if cell.has_piece():
-                        if cell.piece.parent == player:
+                state = squares[new_place[0] * width + new_place[1]]
+                if attacked_piece is None:
+                    if state & OWNER:
+                        if not state & enemy:
                             break
                         else:
-                            attacked_piece = (new_row, new_col)
-                            is_attack = True
-                elif cell.is_empty():
+                            attacked_piece = new_place
+                elif not state & OWNER:
                     copied_ignored = copy.copy(ignored)
                     copied_ignored.add(attacked_piece)
                     d = self._king_attack_depth(
-                        (new_row, new_col), player, depth + 1, copied_ignored
+                        new_place, player, depth + 1, copied_ignored
                     )
                     max_depth = max(max_depth, d)
                 else:
@@ -557,18 +958,24 @@ class Checkers:
         """
         moves = set()
         is_attack = False
-        for row, row_of_pieces in enumerate(self.board):
-            for col, cell in enumerate(row_of_pieces):
-                if cell.has_piece() and cell.piece.parent == player:
-                    if self.can_attack((row, col), cell.piece.parent):
-                        if not is_attack:
-                            moves = set()
-                            is_attack = True
-                        for move in self.possible_moves((row, col)):
-                            moves.add(((row, col), move))
-                    elif not is_attack:
-                        for move in self.possible_moves((row, col)):
-                            moves.add(((row, col), move))
+        width = self.board.width
+        squares = self.board.squares
+        for place in player.pieces.values():
+            # the same as possible_moves, attacks are searched once for both checks
+            attacks = self.possible_attacks(place, player)
+            if attacks:
+                if not is_attack:
+                    moves = set()
+                    is_attack = True
+                for move in attacks:
+                    moves.add((place, move))
+            elif not is_attack:
+                if squares[place[0] * width + place[1]] & KING:
+                    quiet = self.possible_king_moves(place, player)
+                else:
+                    quiet = self.possible_normal_moves(place, player)
+                for move in quiet:
+                    moves.add((place, move))
         return moves
 
     def __str__(self):
@@ -579,3 +986,611 @@ class Checkers:
 
     def __repr__(self):
         return f"Checkers({self.player1.__repr__()}, {self.player2.__repr__()})"
+
+
+class MovePath:
+    """
+    A class representing a complete move of a piece in one round: a single step or a whole
+    multi-jump sequence, made at once by Checkers.apply_path.
+
+    attributes:
+        steps - steps of the move (list of tuples of positions: origin, destination),
+        captured - squares of the captured pieces (int bitmask, bit row * width + col),
+        promotion - whether the piece is changed to king at the end of the move (bool),
+        blocks_opponent - whether the opponent could not move after one of the jumps,
+            which makes the current player the winner (bool)
+    """
+
+    def __init__(self, steps, captured=0, promotion=False, blocks_opponent=False):
+        self.steps = steps
+        self.captured = captured
+        self.promotion = promotion
+        self.blocks_opponent = blocks_opponent
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __repr__(self):
+        return f"MovePath({self.steps}, captured={self.captured:#x})"
+
+
+class BitboardCheckers:
+    """
+    A class of Checkers game stored in integer bitboards.
+
+    The rules are the same as in the Checkers class. Square (row, col) is numbered
+    row * width + col and a set of squares is an int with one bit per square, so a copy
+    of the game is a few int assignments and men moves are generated for all men at once
+    with shift-and-mask operations.
+
+    class variables:
+        directions - all diagonal directions, in the order of Checkers.get_directions,
+        draw_amount - number of rounds with non-attacking king moves before draw
+
+    attributes:
+        width - width and height of the board (int),
+        pieces - masks of pieces of each player, player1 first (list of two ints),
+        kings - mask of king pieces of both players (int),
+        blocked - mask of cells removed in the current round (int),
+        current - index of the currently playing player, 0 for player1 (int),
+        winner - index of the winner of the game (None or int),
+        king_moves_since_last_attack - used in draw checking (int),
+        must_continue - whether a player must continue his move (bool),
+        names - names of the players (tuple of two str)
+    """
+
+    directions = ((-1, -1), (-1, 1), (1, 1), (1, -1))
+    draw_amount = Checkers.draw_amount
+
+    _geometry = {}
+
+    def __init__(self, width=Checkers.default_width, names=("p1", "p2")):
+        self.width = width
+        self.pieces = [0, 0]
+        self.kings = 0
+        self.blocked = 0
+        self.current = 0
+        self.winner = None
+        self.king_moves_since_last_attack = 0
+        self.must_continue = False
+        self.names = tuple(names)
+        (
+            self._rays,
+            self._forward,
+            self._promotion,
+            self._full,
+            self._column_masks,
+        ) = type(self).geometry(width)
+
+    @classmethod
+    def geometry(cls, width):
+        """
+        Get tables describing the board of the given width (built once per width).
+        :param width: width of the board (int)
+        :return: tuple: rays (for every square a tuple of four tuples of squares, one per
+            direction), forward directions of each player (indices into directions),
+            promotion row masks of each player, mask of the whole board, source masks that
+            keep a shift in each direction from wrapping around the board edge
+        """
+        if width not in cls._geometry:
+            rays = []
+            for row in range(width):
+                for col in range(width):
+                    square_rays = []
+                    for d_row, d_col in cls.directions:
+                        ray = []
+                        r, c = row + d_row, col + d_col
+                        while 0 <= r < width and 0 <= c < width:
+                            ray.append(r * width + c)
+                            r, c = r + d_row, c + d_col
+                        square_rays.append(tuple(ray))
+                    rays.append(tuple(square_rays))
+            row_mask = (1 << width) - 1
+            full = (1 << (width * width)) - 1
+            first_column = sum(1 << (r * width) for r in range(width))
+            last_column = first_column << (width - 1)
+            column_masks = tuple(
+                full & ~(first_column if d_col < 0 else last_column)
+                for _, d_col in cls.directions
+            )
+            cls._geometry[width] = (
+                tuple(rays),
+                ((3, 2), (1, 0)),
+                (row_mask << (width * (width - 1)), row_mask),
+                full,
+                column_masks,
+            )
+        return cls._geometry[width]
+
+    @classmethod
+    def from_checkers(cls, game):
+        """
+        Create a bitboard copy of the game.
+        :param game: game (class Checkers)
+        :return: class BitboardCheckers
+        """
+        bitboard = cls(game.board.width, (str(game.player1), str(game.player2)))
+        for square, state in enumerate(game.board.squares):
+            bit = 1 << square
+            if state & BLOCKED:
+                bitboard.blocked |= bit
+            if state & OWNER:
+                bitboard.pieces[0 if state & PLAYER1 else 1] |= bit
+                if state & KING:
+                    bitboard.kings |= bit
+        bitboard.current = 0 if game.current_player == game.player1 else 1
+        if game.winner is not None:
+            bitboard.winner = 0 if game.winner == game.player1 else 1
+        bitboard.king_moves_since_last_attack = game.king_moves_since_last_attack
+        bitboard.must_continue = game.must_continue
+        return bitboard
+
+    def to_checkers(self, game=None):
+        """
+        Write the position into an object-grid game.
+        :param game: game to overwrite (class Checkers, optional - a new one is created)
+        :return: class Checkers
+        """
+        if game is None:
+            game = Checkers(
+                player_arguments=({"name": self.names[0]}, {"name": self.names[1]}),
+                board_arguments={"width": self.width},
+                arrange_pieces=False,
+            )
+        else:
+            assert game.board.width == self.width, "Board widths differ."
+            game.board.create_board()
+        players = (game.player1, game.player2)
+        game.blocked_cells = set()
+        for player in players:
+            player.pieces.clear()
+        for square in range(self.width * self.width):
+            bit = 1 << square
+            row, col = divmod(square, self.width)
+            for side in (0, 1):
+                if self.pieces[side] & bit:
+                    piece = Piece(players[side])
+                    if self.kings & bit:
+                        piece.set_king()
+                    game.put_piece((row, col), piece)
+            if self.blocked & bit:
+                game.board.squares[square] |= BLOCKED
+                game.blocked_cells.add((row, col))
+        game.current_player = players[self.current]
+        game.winner = None if self.winner is None else players[self.winner]
+        game.king_moves_since_last_attack = self.king_moves_since_last_attack
+        game.must_continue = self.must_continue
+        game.hash = game.compute_hash()
+        game.value = game.compute_value()
+        return game
+
+    def copy(self):
+        other = type(self).__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        other.pieces = self.pieces[:]
+        return other
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def square(self, place):
+        row, col = place
+        assert 0 <= row < self.width and 0 <= col < self.width
+        return row * self.width + col
+
+    def place(self, square):
+        return divmod(square, self.width)
+
+    def _shift(self, mask, direction):
+        """
+        Function used internally. Move every square of the mask one step in the direction.
+        :param mask: mask of squares (int)
+        :param direction: index into directions (int)
+        :return: mask of squares (int), squares leaving the board are dropped
+        """
+        d_row, d_col = type(self).directions[direction]
+        mask &= self._column_masks[direction]
+        step = d_row * self.width + d_col
+        if step > 0:
+            return (mask << step) & self._full
+        return mask >> -step
+
+    def next_player(self):
+        assert not self.must_continue, "Current player must continue his moves."
+        self.blocked = 0
+        self.calculate_winner()
+        self.current = 1 - self.current
+
+    def is_end_of_game(self):
+        if self.king_moves_since_last_attack > self.draw_amount:
+            # draw
+            self.winner = None
+            return True
+        return self.winner is not None
+
+    def get_score(self, side=None):
+        if side is None:
+            side = self.current
+        val = (
+            self.pieces[0].bit_count()
+            + (self.pieces[0] & self.kings).bit_count()
+            - self.pieces[1].bit_count()
+            - (self.pieces[1] & self.kings).bit_count()
+        )
+        return val if side == 0 else -val
+
+    def calculate_winner(self):
+        current = self.current
+        other = 1 - current
+        # check amount of pieces
+        if not self.pieces[other]:
+            self.winner = current
+            return
+        # check if any player is blocked
+        if not self.can_move(other):
+            self.winner = current
+        if not self.can_move(current):
+            self.winner = other
+
+    def can_move(self, side):
+        """
+        Whether any piece of the player has a possible move (stops at the first one found).
+        :param side: index of the player (int)
+        :return: bool
+        """
+        own = self.pieces[side]
+        empty = self._full & ~(own | self.pieces[1 - side])
+        men = own & ~self.kings
+        for direction in self._forward[side]:
+            if self._shift(men, direction) & empty:
+                return True
+        enemies = self.pieces[1 - side]
+        for direction in range(4):
+            if self._shift(self._shift(men, direction) & enemies, direction) & empty:
+                return True
+        # a king moves through pieces, only blocked cells stop it
+        free = empty & ~self.blocked
+        kings = own & self.kings
+        while kings:
+            bit = kings & -kings
+            kings ^= bit
+            for ray in self._rays[bit.bit_length() - 1]:
+                for square in ray:
+                    if self.blocked >> square & 1:
+                        break
+                    if free >> square & 1:
+                        return True
+        return False
+
+    def can_attack(self, square):
+        """
+        Whether the piece on the square can attack.
+        :param square: square index (int)
+        :return: bool
+        """
+        side = 0 if self.pieces[0] >> square & 1 else 1
+        own = self.pieces[side]
+        enemies = self.pieces[1 - side]
+        occupied = own | enemies
+        if not self.kings >> square & 1:
+            for ray in self._rays[square]:
+                if (
+                    len(ray) > 1
+                    and enemies >> ray[0] & 1
+                    and not occupied >> ray[1] & 1
+                ):
+                    return True
+            return False
+        for ray in self._rays[square]:
+            for i, next_square in enumerate(ray):
+                if self.blocked >> next_square & 1 or own >> next_square & 1:
+                    break
+                if enemies >> next_square & 1:
+                    if i + 1 < len(ray):
+                        landing = ray[i + 1]
+                        if not (occupied | self.blocked) >> landing & 1:
+                            return True
+                    break
+        return False
+
+    def possible_moves(self, square):
+        """
+        Get possible moves from the given square.
+        :param square: square index (int)
+        :return: a list of destination squares (ints)
+        """
+        if self.kings >> square & 1:
+            attacks = self.possible_king_attacks(square)
+            if len(attacks) > 0:
+                return attacks
+            return self.possible_king_moves(square)
+        attacks = self.possible_normal_attacks(square)
+        if len(attacks):
+            return attacks
+        side = 0 if self.pieces[0] >> square & 1 else 1
+        empty = ~(self.pieces[0] | self.pieces[1])
+        moves = []
+        for direction in self._forward[side]:
+            ray = self._rays[square][direction]
+            if ray and empty >> ray[0] & 1:
+                moves.append(ray[0])
+        return moves
+
+    def possible_king_moves(self, square):
+        """
+        Get non-attacking moves of a king piece.
+        :param square: square index (int)
+        :return: a list of destination squares (ints)
+        """
+        empty = ~(self.pieces[0] | self.pieces[1])
+        moves = []
+        for ray in self._rays[square]:
+            for next_square in ray:
+                if self.blocked >> next_square & 1:
+                    break
+                if empty >> next_square & 1:
+                    moves.append(next_square)
+        return moves
+
+    def possible_normal_attacks(self, square):
+        """
+        Get attacking moves of a non-king piece with the longest attack.
+        :param square: square index (int)
+        :return: a list of destination squares (ints)
+        """
+        side = 0 if self.pieces[0] >> square & 1 else 1
+        own = self.pieces[side]
+        enemies = self.pieces[1 - side]
+        attacks = []
+        max_depth = 0
+        for ray in self._rays[square]:
+            if len(ray) < 2 or not enemies >> ray[0] & 1:
+                continue
+            if (own | enemies) >> ray[1] & 1:
+                continue
+            if square < self.width:
+                attacks.append(ray[1])
+                continue
+            d = self._normal_attack_depth(ray[1], own, enemies, 0, 0)
+            if d > max_depth:
+                attacks = [ray[1]]
+                max_depth = d
+            elif d == max_depth:
+                attacks.append(ray[1])
+        return attacks
+
+    def _normal_attack_depth(self, square, own, enemies, depth, ignored):
+        """
+        Function used internally. Get depth of the maximum attack from the given square (for
+        non-king piece), the same way as Checkers._normal_attack_depth.
+        :param square: square index (int)
+        :param own: mask of the player's pieces (int)
+        :param enemies: mask of the enemy's pieces (int)
+        :param depth: depth of the attack
+        :param ignored: mask of ignored squares (pieces attacked in previous attacks)
+        :return: maximum depth of the attack
+        """
+        stop = ignored | self.blocked
+        max_depth = depth
+        for ray in self._rays[square]:
+            is_attack = False
+            for i, next_square in enumerate(ray):
+                if stop >> next_square & 1:
+                    break
+                if not is_attack:
+                    if not enemies >> next_square & 1:
+                        break
+                    is_attack = True
+                elif not (own | enemies) >> next_square & 1:
+                    d = self._normal_attack_depth(
+                        next_square,
+                        own,
+                        enemies,
+                        depth + 1,
+                        ignored | 1 << ray[i - 1],
+                    )
+                    max_depth = max(max_depth, d)
+                else:
+                    break
+        return max_depth
+
+    def possible_king_attacks(self, square):
+        """
+        Get attacking moves of a king piece with the longest attack.
+        :param square: square index (int)
+        :return: a list of destination squares (ints)
+        """
+        side = 0 if self.pieces[0] >> square & 1 else 1
+        own = self.pieces[side]
+        enemies = self.pieces[1 - side]
+        attacks = []
+        max_depth = 0
+        for ray in self._rays[square]:
+            attacked_pieces = 0
+            blocked = False
+            for next_square in ray:
+                if self.blocked >> next_square & 1 or own >> next_square & 1:
+                    break
+                if enemies >> next_square & 1:
+                    if blocked:
+                        break
+                    # only the first attacked piece must be followed by an empty cell
+                    blocked = not attacked_pieces
+                    attacked_pieces |= 1 << next_square
+                elif attacked_pieces:
+                    blocked = False
+                    d = self._king_attack_depth(
+                        next_square, own, enemies, 0, attacked_pieces
+                    )
+                    if d > max_depth:
+                        max_depth = d
+                        attacks = [next_square]
+                    elif d == max_depth:
+                        attacks.append(next_square)
+        return attacks
+
+    def _king_attack_depth(self, square, own, enemies, depth, ignored):
+        """
+        Function used internally. Get depth of the maximum attack from the given square (for
+        king piece), the same way as Checkers._king_attack_depth.
+        :param square: square index (int)
+        :param own: mask of the player's pieces (int)
+        :param enemies: mask of the enemy's pieces (int)
+        :param depth: depth of the attack
+        :param ignored: mask of ignored squares (pieces attacked in previous attacks)
+        :return: maximum depth of the attack
+        """
+        stop = ignored | self.blocked
+        max_depth = depth
+        for ray in self._rays[square]:
+            attacked_piece = 0
+            for next_square in ray:
+                if stop >> next_square & 1 or own >> next_square & 1:
+                    break
+                if enemies >> next_square & 1:
+                    if attacked_piece:
+                        break
+                    attacked_piece = 1 << next_square
+                elif attacked_piece:
+                    d = self._king_attack_depth(
+                        next_square, own, enemies, depth + 1, ignored | attacked_piece
+                    )
+                    max_depth = max(max_depth, d)
+        return max_depth
+
+    def get_possible_moves(self, side=None):
+        """
+        Get possible first steps of the moves of the player in this round.
+        :param side: index of the player (int, optional - the current player)
+        :return: a list of moves (move is a tuple of squares: origin, destination)
+        """
+        if side is None:
+            side = self.current
+        own = self.pieces[side]
+        enemies = self.pieces[1 - side]
+        empty = self._full & ~(own | enemies)
+        men = own & ~self.kings
+        # men that may attack - a man attacks in every direction
+        attackers = own & self.kings
+        for direction in range(4):
+            landing = (
+                self._shift(self._shift(men, direction) & enemies, direction) & empty
+            )
+            back = (direction + 2) % 4
+            attackers |= self._shift(self._shift(landing, back), back)
+        moves = []
+        while attackers:
+            bit = attackers & -attackers
+            attackers ^= bit
+            square = bit.bit_length() - 1
+            if self.kings & bit:
+                attacks = self.possible_king_attacks(square)
+            else:
+                attacks = self.possible_normal_attacks(square)
+            moves.extend((square, dest) for dest in attacks)
+        if moves:
+            return moves
+        for direction in self._forward[side]:
+            targets = self._shift(men, direction) & empty
+            d_row, d_col = type(self).directions[direction]
+            offset = d_row * self.width + d_col
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                dest = bit.bit_length() - 1
+                moves.append((dest - offset, dest))
+        kings = own & self.kings
+        while kings:
+            bit = kings & -kings
+            kings ^= bit
+            square = bit.bit_length() - 1
+            moves.extend((square, dest) for dest in self.possible_king_moves(square))
+        return moves
+
+    def _between(self, orig, dest):
+        d_row = 1 if dest >= orig else -1
+        d_col = 1 if dest % self.width > orig % self.width else -1
+        mask = 0
+        for square in self._rays[orig][type(self).directions.index((d_row, d_col))]:
+            if square == dest:
+                break
+            mask |= 1 << square
+        return mask
+
+    def move(self, orig, dest):
+        """
+        Move the piece from orig to dest.
+        :param orig: origin square (int)
+        :param dest: destination square (int)
+        :return: whether the move must continue in this round (bool)
+        """
+        orig_bit = 1 << orig
+        dest_bit = 1 << dest
+        side = 0 if self.pieces[0] & orig_bit else 1
+        assert (
+            self.pieces[side] & orig_bit
+        ), f"{orig} -> {dest}: Cannot move empty cell."
+        assert not (
+            (self.pieces[0] | self.pieces[1]) & dest_bit
+        ), f"{orig} -> {dest}: Cannot move into non-empty cell."
+        is_king = self.kings & orig_bit
+        enemies = 0
+        if abs(dest // self.width - orig // self.width) > 1:
+            enemies = self._between(orig, dest) & self.pieces[1 - side]
+            if is_king and not enemies:
+                self.king_moves_since_last_attack += 1
+            else:
+                self.king_moves_since_last_attack = 0
+            self.pieces[1 - side] &= ~enemies
+            self.kings &= ~enemies
+            self.blocked |= enemies
+        self.pieces[side] ^= orig_bit | dest_bit
+        if is_king:
+            self.kings ^= orig_bit | dest_bit
+        elif self._promotion[side] & dest_bit:
+            if not self.can_attack(dest):
+                self.kings |= dest_bit
+                self.must_continue = False
+            else:
+                self.must_continue = True
+            self.calculate_winner()
+            return self.must_continue
+        self.must_continue = bool(enemies) and self.can_attack(dest)
+        self.calculate_winner()
+        return self.must_continue
+
+    def generate_moves(self):
+        """
+        Get every complete move of the current player in this round together with the game
+        after it. Multi-jump sequences are a single move, the player is switched after it.
+        :return: a list of tuples (moves, game) - moves is a tuple of steps (origin and
+            destination squares), game is class BitboardCheckers
+        """
+        children = []
+        for orig, dest in self.get_possible_moves():
+            child = self.copy()
+            if child.move(orig, dest):
+                child._continue_move(((orig, dest),), dest, children)
+            else:
+                child.next_player()
+                children.append((((orig, dest),), child))
+        return children
+
+    def _continue_move(self, steps, square, children):
+        """
+        Function used internally. Expand every continuation of the move of the piece on the
+        square into children.
+        """
+        for dest in self.possible_moves(square):
+            child = self.copy()
+            if child.move(square, dest):
+                child._continue_move(steps + ((square, dest),), dest, children)
+            else:
+                child.next_player()
+                children.append((steps + ((square, dest),), child))
+
+    def __str__(self):
+        return str(self.to_checkers())
+
+    def __repr__(self):
+        return f"BitboardCheckers({self.names[0]}, {self.names[1]})"
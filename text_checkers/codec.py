@@ -0,0 +1,397 @@
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # optional, installed with the "vectorized" extra
+    np = None
+from Checkers import Checkers, BitboardCheckers
+
+# Positions are stored as the bitboards of BitboardCheckers: masks of player1 pieces,
+# player2 pieces, kings and cells blocked in the current round, side to move, the draw
+# counter and whether the player must continue the move. The winner is not stored, it is
+# checked when a single position is decoded.
+#
+# Binary form: a record of fixed size for the width - width, flags (1: player2 to move,
+# 2: must continue), king_moves_since_last_attack and the four masks as little-endian
+# integers of (width * width + 7) // 8 bytes.
+#
+# Text form: fields separated by ":" - width, player to move (1 or 2), pieces of player1,
+# pieces of player2 (squares separated by ",", kings prefixed with "K"), the draw counter
+# and, only when the player must continue the move, "+" followed by the blocked squares,
+# ex. "8:2:b6,Kd2:c7,e7:0" or "8:1:f4:Kh2:0:+e5".
+#
+# With NumPy, a buffer or a file of binary records is also read and written at once as a
+# structured array of record_dtype, without building games.
+
+flag_player2 = 1
+flag_must_continue = 2
+
+# widths of boards of decoded positions, even
+min_width = 4
+max_width = 12
+
+_formats = {}
+_dtypes = {}
+
+
+def record_format(width):
+    """
+    Get the struct format of a binary record of a position on the board of the given
+    width.
+    :param width: width of the board (int)
+    :return: class struct.Struct
+    """
+    if width not in _formats:
+        size = (width * width + 7) // 8
+        _formats[width] = struct.Struct(f"<BBB{size}s{size}s{size}s{size}s")
+    return _formats[width]
+
+
+def record_dtype(width):
+    """
+    Get the NumPy structured type of a binary record, the same layout as record_format:
+    fields width, flags, counter (uint8) and player1, player2, kings, blocked (arrays of
+    the bytes of the masks).
+    :param width: width of the board (int)
+    :return: class numpy.dtype
+    """
+    if np is None:
+        raise ImportError(
+            "NumPy is needed for arrays of records, install the vectorized extra."
+        )
+    if width not in _dtypes:
+        size = (width * width + 7) // 8
+        _dtypes[width] = np.dtype(
+            [("width", "u1"), ("flags", "u1"), ("counter", "u1")]
+            + [
+                (name, "u1", (size,))
+                for name in ("player1", "player2", "kings", "blocked")
+            ]
+        )
+    return _dtypes[width]
+
+
+def check_width(width):
+    """
+    Check the width of the board of a decoded position.
+    :param width: width of the board
+    :return: the width, ValueError for a wrong one
+    """
+    if (
+        not isinstance(width, int)
+        or isinstance(width, bool)
+        or width % 2
+        or not min_width <= width <= max_width
+    ):
+        raise ValueError(
+            f"Incorrect width: {width!r} (even, from {min_width} to {max_width})"
+        )
+    return width
+
+
+def record_size(width):
+    """Number of bytes of a binary record, see record_format."""
+    return record_format(width).size
+
+
+def _bitboard(game):
+    """Function used internally. Bitboards of a game of any class."""
+    if isinstance(game, BitboardCheckers):
+        return game
+    return BitboardCheckers.from_checkers(game)
+
+
+def encode(game):
+    """
+    Encode the position in the binary form.
+    :param game: game (class Checkers or BitboardCheckers)
+    :return: bytes of record_size(width)
+    """
+    bitboard = _bitboard(game)
+    record = record_format(bitboard.width)
+    size = (bitboard.width * bitboard.width + 7) // 8
+    return record.pack(
+        bitboard.width,
+        bitboard.current * flag_player2 | bitboard.must_continue * flag_must_continue,
+        bitboard.king_moves_since_last_attack,
+        bitboard.pieces[0].to_bytes(size, "little"),
+        bitboard.pieces[1].to_bytes(size, "little"),
+        bitboard.kings.to_bytes(size, "little"),
+        bitboard.blocked.to_bytes(size, "little"),
+    )
+
+
+def _from_fields(fields, names=("p1", "p2")):
+    """Function used internally. Bitboards of unpacked fields of a binary record."""
+    width, flags, counter, *masks = fields
+    bitboard = BitboardCheckers(width, names)
+    player1, player2, kings, blocked = (
+        int.from_bytes(mask, "little") for mask in masks
+    )
+    bitboard.pieces = [player1, player2]
+    bitboard.kings = kings
+    bitboard.blocked = blocked
+    bitboard.current = 1 if flags & flag_player2 else 0
+    bitboard.must_continue = bool(flags & flag_must_continue)
+    bitboard.king_moves_since_last_attack = counter
+    return bitboard
+
+
+def _set_winner(bitboard):
+    """
+    Function used internally. Check the winner of a decoded position as the game does
+    after a move: by the player who made it, who is still to move when the move goes on.
+    """
+    if bitboard.must_continue:
+        bitboard.calculate_winner()
+        return
+    bitboard.current = 1 - bitboard.current
+    bitboard.calculate_winner()
+    bitboard.current = 1 - bitboard.current
+
+
+def decode_bitboard(data, offset=0):
+    """
+    Decode a position in the binary form into bitboards.
+    :param data: bytes-like object holding the record
+    :param offset: offset of the record in data (int)
+    :return: class BitboardCheckers, ValueError for a wrong width
+    """
+    record = record_format(check_width(data[offset]))
+    bitboard = _from_fields(record.unpack_from(data, offset))
+    _set_winner(bitboard)
+    return bitboard
+
+
+def decode(data, game=None):
+    """
+    Decode a position in the binary form.
+    :param data: bytes-like object holding the record
+    :param game: game to overwrite (class Checkers, optional - a new one is created)
+    :return: class Checkers
+    """
+    return decode_bitboard(data).to_checkers(game)
+
+
+def encode_batch(games):
+    """
+    Encode many positions into one buffer of records following each other.
+    :param games: iterable of games (class Checkers or BitboardCheckers) of the same width
+    :return: bytes
+    """
+    return b"".join(encode(game) for game in games)
+
+
+def decode_batch(data, width=Checkers.default_width):
+    """
+    Decode a buffer of records of encode_batch. The records are unpacked by one call
+    walking the whole buffer and positions are built while the iteration goes, so a corpus
+    read from a file is never held twice in memory.
+    :param data: bytes-like object of records of the same width
+    :param width: width of the board (int)
+    :return: generator of games (class BitboardCheckers)
+    """
+    record = record_format(width)
+    if len(data) % record.size:
+        raise ValueError(f"Buffer is not made of records of {record.size} bytes.")
+    for fields in record.iter_unpack(data):
+        if fields[0] != width:
+            raise ValueError(f"Record of width {fields[0]} among width {width}.")
+        yield _from_fields(fields)
+
+
+def decode_array(data, width=Checkers.default_width):
+    """
+    Decode a buffer of records of encode_batch at once into an array of record_dtype. The
+    array is a view of the buffer, nothing is copied.
+    :param data: bytes-like object of records of the same width
+    :param width: width of the board (int)
+    :return: structured array (numpy.ndarray), ValueError for a wrong buffer
+    """
+    dtype = record_dtype(check_width(width))
+    if len(data) % dtype.itemsize:
+        raise ValueError(f"Buffer is not made of records of {dtype.itemsize} bytes.")
+    records = np.frombuffer(data, dtype=dtype)
+    _check_records(records, width)
+    return records
+
+
+def encode_array(records):
+    """
+    Encode an array of record_dtype at once into a buffer of records, the same as
+    encode_batch of the games of the records.
+    :param records: structured array (numpy.ndarray)
+    :return: bytes
+    """
+    return np.ascontiguousarray(records).tobytes()
+
+
+def _check_records(records, width):
+    """Function used internally. ValueError for records which are not of the width."""
+    if (records["width"] != width).any():
+        raise ValueError(f"Records of another width among width {width}.")
+
+
+def read_array(path, width=Checkers.default_width):
+    """
+    Read a file of binary records at once into an array of record_dtype.
+    :param path: path of the file (str)
+    :param width: width of the board (int)
+    :return: structured array (numpy.ndarray), ValueError for a wrong file
+    """
+    dtype = record_dtype(check_width(width))
+    with open(path, "rb") as file:
+        records = np.fromfile(file, dtype=dtype)
+        if file.read(1):
+            raise ValueError(f"File is not made of records of {dtype.itemsize} bytes.")
+    _check_records(records, width)
+    return records
+
+
+def write_array(path, records):
+    """
+    Write an array of record_dtype to a file of binary records at once.
+    :param path: path of the file (str)
+    :param records: structured array (numpy.ndarray)
+    :return: number of written positions (int)
+    """
+    np.ascontiguousarray(records).tofile(path)
+    return len(records)
+
+
+def write_positions(path, games):
+    """
+    Write positions to a file of binary records.
+    :param path: path of the file (str)
+    :param games: iterable of games (class Checkers or BitboardCheckers) of the same width
+    :return: number of written positions (int)
+    """
+    count = 0
+    with open(path, "wb") as file:
+        for game in games:
+            file.write(encode(game))
+            count += 1
+    return count
+
+
+def read_positions(path, width=Checkers.default_width, chunk=65536):
+    """
+    Read positions from a file of binary records, chunk records at a time.
+    :param path: path of the file (str)
+    :param width: width of the board (int)
+    :param chunk: number of records read at once (int)
+    :return: generator of games (class BitboardCheckers)
+    """
+    size = record_size(width)
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(size * chunk)
+            if not data:
+                return
+            yield from decode_batch(data, width)
+
+
+def square_name(square, width):
+    """Name of the square numbered row * width + col, ex. "b6" on the 8x8 board."""
+    row, col = divmod(square, width)
+    return f"{chr(ord('a') + col)}{width - row}"
+
+
+def square_number(name, width):
+    """Number of the square of square_name, ValueError for a wrong name."""
+    col = ord(name[:1]) - ord("a") if name else -1
+    try:
+        row = width - int(name[1:])
+    except ValueError:
+        raise ValueError(f"Incorrect square: {name}") from None
+    if not (0 <= col < width and 0 <= row < width):
+        raise ValueError(f"Incorrect square: {name}")
+    return row * width + col
+
+
+def _squares(mask):
+    """Function used internally. Numbers of squares of a mask, in increasing order."""
+    squares = []
+    while mask:
+        bit = mask & -mask
+        squares.append(bit.bit_length() - 1)
+        mask ^= bit
+    return squares
+
+
+def to_text(game):
+    """
+    Encode the position in the text form.
+    :param game: game (class Checkers or BitboardCheckers)
+    :return: str
+    """
+    bitboard = _bitboard(game)
+    width = bitboard.width
+    fields = [str(width), str(bitboard.current + 1)]
+    for mask in bitboard.pieces:
+        fields.append(
+            ",".join(
+                ("K" if bitboard.kings >> square & 1 else "")
+                + square_name(square, width)
+                for square in _squares(mask)
+            )
+        )
+    fields.append(str(bitboard.king_moves_since_last_attack))
+    if bitboard.must_continue:
+        fields.append(
+            "+"
+            + ",".join(
+                square_name(square, width) for square in _squares(bitboard.blocked)
+            )
+        )
+    return ":".join(fields)
+
+
+def from_text_bitboard(text):
+    """
+    Decode a position in the text form into bitboards.
+    :param text: position (str)
+    :return: class BitboardCheckers, ValueError for a wrong text
+    """
+    fields = text.strip().split(":")
+    if len(fields) not in (5, 6) or fields[1] not in ("1", "2"):
+        raise ValueError(f"Incorrect position: {text}")
+    try:
+        width = int(fields[0])
+        counter = int(fields[4])
+    except ValueError:
+        raise ValueError(f"Incorrect position: {text}") from None
+    check_width(width)
+    if not 0 <= counter <= 255:
+        # a single byte of the binary form
+        raise ValueError(f"Incorrect draw counter: {counter} (from 0 to 255)")
+    bitboard = BitboardCheckers(width)
+    bitboard.current = int(fields[1]) - 1
+    bitboard.king_moves_since_last_attack = counter
+    for side in (0, 1):
+        for name in filter(None, fields[2 + side].split(",")):
+            king = name.startswith("K")
+            bit = 1 << square_number(name[king:], width)
+            if (bitboard.pieces[0] | bitboard.pieces[1]) & bit:
+                raise ValueError(f"Two pieces on the square {name[king:]}: {text}")
+            bitboard.pieces[side] |= bit
+            if king:
+                bitboard.kings |= bit
+    if len(fields) == 6:
+        if not fields[5].startswith("+"):
+            raise ValueError(f"Incorrect position: {text}")
+        bitboard.must_continue = True
+        for name in filter(None, fields[5][1:].split(",")):
+            bitboard.blocked |= 1 << square_number(name, width)
+    _set_winner(bitboard)
+    return bitboard
+
+
+def from_text(text, game=None):
+    """
+    Decode a position in the text form.
+    :param text: position (str)
+    :param game: game to overwrite (class Checkers, optional - a new one is created)
+    :return: class Checkers
+    """
+    return from_text_bitboard(text).to_checkers(game)
@@ -1,3 +1,14 @@
+import copy
+
+# Codes of squares of the board: the owner of the piece (PLAYER1 or PLAYER2, 0 - an empty
+# square), KING for a king and BLOCKED for a square removed in the current round.
+PLAYER1 = 1
+PLAYER2 = 2
+OWNER = PLAYER1 | PLAYER2
+KING = 4
+BLOCKED = 8
+
+
 class Piece:
     """
     A class representing a piece on the Checkers board.
@@ -7,6 +18,8 @@ class Piece:
         _is_king - whether the piece is king (bool)
     """
 
+    __slots__ = ("parent", "_is_king")
+
     def __init__(self, parent=None):
         self.parent = parent
         self._is_king = False
@@ -17,6 +30,16 @@ class Piece:
     def set_king(self):
         self._is_king = True
 
+    def unset_king(self):
+        self._is_king = False
+
+    def __deepcopy__(self, memo):
+        other = Piece.__new__(type(self))
+        memo[id(self)] = other
+        other.parent = copy.deepcopy(self.parent, memo)
+        other._is_king = self._is_king
+        return other
+
     def __str__(self):
         return f"{self.parent}({'k' if self.is_king() else 'm'})"
 
@@ -26,28 +49,50 @@ class Piece:
 
 class Cell:
     """
-    A class representing a cell in the Checkers board.
+    A class representing a cell in the Checkers board - a view of one square of the board,
+    changes of the cell change the board.
 
     attributes:
-        piece - piece inside the cell (class Piece)
-        blocked - whether the cell allows an attack to be performed on the cell (bool)
+        board - board of the cell (class Board)
+        index - number of the square: row * width + col (int)
     """
 
-    def __init__(self, piece=None):
-        self.piece = piece
-        self.blocked = False
+    __slots__ = ("board", "index")
+
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
+
+    @property
+    def piece(self):
+        return self.board.pieces[self.index]
+
+    @piece.setter
+    def piece(self, piece):
+        self.board.set_piece(self.index, piece)
+
+    @property
+    def blocked(self):
+        return bool(self.board.squares[self.index] & BLOCKED)
+
+    @blocked.setter
+    def blocked(self, blocked):
+        if blocked:
+            self.board.squares[self.index] |= BLOCKED
+        else:
+            self.board.squares[self.index] &= ~BLOCKED
 
     def has_piece(self):
-        return self.piece is not None
+        return bool(self.board.squares[self.index] & OWNER)
 
     def is_empty(self):
-        return self.piece is None
+        return not self.board.squares[self.index] & OWNER
 
     def empty(self):
-        self.piece = None
+        self.board.set_piece(self.index, None)
 
     def set_piece(self, piece):
-        self.piece = piece
+        self.board.set_piece(self.index, piece)
 
     def is_blocked(self):
         return self.blocked
@@ -74,14 +119,17 @@ class Player:
 
     attributes:
         name - username (str)
-        pieces - a set of pieces (set of class Piece entities)
+        pieces - live pieces with their positions (dict: class Piece -> tuple of coordinates -
+            row, column), kept up to date by the game
     """
 
     num = 0
 
+    __slots__ = ("name", "pieces")
+
     def __init__(self, name=None):
         self.name = name if name is not None else f"p{type(self).num + 1}"
-        self.pieces = set()
+        self.pieces = {}
         type(self).num += 1
 
     def is_alive(self):
@@ -96,25 +144,79 @@ class Player:
 
 class Board:
     """
-    A class representing a Checkers board.
+    A class representing a Checkers board. The state of every square is a single byte, so a
+    copy of the board is a copy of a buffer and a list.
 
     attributes:
         width - width and height of the board (int)
-        cells - a list of rows - rows are lists of cells (list(list(class Cell)))
+        squares - codes of squares numbered row * width + col: owner, KING and BLOCKED bits
+            (bytearray)
+        pieces - pieces standing on the squares (list: None or class Piece)
+        players - players owning PLAYER1 and PLAYER2 pieces, set by the game (None or tuple
+            of two: class Player)
     """
 
+    __slots__ = ("width", "squares", "pieces", "players")
+
     def __init__(self, width, cell_arguments=None):
         self.width = width
-        self.cells = None
+        self.squares = None
+        self.pieces = None
+        self.players = None
         self.create_board(cell_arguments)
 
     def create_board(self, cell_arguments=None):
-        if cell_arguments is None:
-            cell_arguments = {}
-        self.cells = [
-            [Cell(**cell_arguments) for h in range(self.width)]
-            for w in range(self.width)
-        ]
+        """
+        Empty the board.
+        :param cell_arguments: attributes given to every cell (dict: piece, blocked; optional)
+        """
+        size = self.width * self.width
+        self.squares = bytearray(size)
+        self.pieces = [None] * size
+        if cell_arguments:
+            for index in range(size):
+                cell = Cell(self, index)
+                for name, value in cell_arguments.items():
+                    setattr(cell, name, value)
+
+    @property
+    def cells(self):
+        """A list of rows - rows are lists of cells (list(list(class Cell)))."""
+        return [self[row] for row in range(self.width)]
+
+    def piece_code(self, piece):
+        """
+        Get the code of the square holding the piece, without the BLOCKED bit.
+        :param piece: None or class Piece
+        :return: int
+        """
+        if piece is None:
+            return 0
+        if self.players is not None and piece.parent is self.players[1]:
+            code = PLAYER2
+        else:
+            code = PLAYER1
+        return code | KING if piece.is_king() else code
+
+    def set_piece(self, index, piece):
+        """
+        Put the piece on the square (None - empty it), the BLOCKED bit stays.
+        :param index: number of the square: row * width + col (int)
+        :param piece: None or class Piece
+        """
+        self.pieces[index] = piece
+        self.squares[index] = self.squares[index] & BLOCKED | self.piece_code(piece)
+
+    def swap(self, index, other):
+        """
+        Swap the contents of two squares, the BLOCKED bits included.
+        :param index: number of the square: row * width + col (int)
+        :param other: number of the other square (int)
+        """
+        squares = self.squares
+        pieces = self.pieces
+        squares[index], squares[other] = squares[other], squares[index]
+        pieces[index], pieces[other] = pieces[other], pieces[index]
 
     def in_bounds(self, row, col):
         if 0 <= row < self.width and 0 <= col < self.width:
@@ -124,32 +226,46 @@ class Board:
 
     def remove_piece(self, piece):
         if isinstance(piece, Piece):
-            for r, row in enumerate(self.cells):
-                for c, cell in enumerate(row):
-                    if cell.piece == piece:
-                        cell.piece.empty()
-                        return
+            if piece.parent is not None and piece in piece.parent.pieces:
+                row, col = piece.parent.pieces[piece]
+                index = row * self.width + col
+                if self.pieces[index] is piece:
+                    self.set_piece(index, None)
+                    return
+            for index, other in enumerate(self.pieces):
+                if other is piece:
+                    self.set_piece(index, None)
+                    return
         elif isinstance(piece, tuple):
             assert len(piece) == 2, f"Wrong piece tuple: {piece}"
             row, col = piece
             assert self.in_bounds(row, col)
-            cell = self.cells[row][col]
-            self.cells[row][col].empty()
+            self.set_piece(row * self.width + col, None)
         else:
             raise Exception(f"Wrong piece type: {piece}")
 
     def __getitem__(self, row):
-        # bracket operator
-        return self.cells[row]  # returns a list - mutable - no need for __setitem__
+        # bracket operator, returns views of the cells of the row
+        start = row * self.width
+        return [Cell(self, index) for index in range(start, start + self.width)]
+
+    def __deepcopy__(self, memo):
+        other = Board.__new__(type(self))
+        memo[id(self)] = other
+        other.width = self.width
+        other.squares = bytearray(self.squares)
+        other.pieces = copy.deepcopy(self.pieces, memo)
+        other.players = copy.deepcopy(self.players, memo)
+        return other
 
     def __str__(self):
         string = "  \t"
         for i in range(self.width):
             string += "  " + chr(ord("a") + i) + "  \t"
         string += "\n"
-        for i, row in enumerate(self.cells):
+        for i in range(self.width):
             string += f"{self.width - i}\t"
-            for cell in row:
+            for cell in self[i]:
                 string += f"{cell}\t"
             string += "\n"
         return string
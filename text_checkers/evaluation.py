@@ -0,0 +1,79 @@
+class Evaluation:
+    """
+    A class representing weights of the evaluation of a position. The value of a position
+    is the sum of values of pieces of player1 minus the sum of values of pieces of player2.
+    A piece is worth its material weight plus positional terms, all of them depending only
+    on the square, so the sum can be kept up to date on every move (Checkers.value).
+
+    class variables:
+        _tables - cache of per-square tables for weights and a width of the board
+
+    attributes:
+        man - value of a man (number),
+        king - value of a king (number),
+        advancement - value of every row a man has advanced from its own back rank (number),
+        center - value of every ring of squares between a piece and the edge of the board
+            (number),
+        back_rank - value of a man guarding its own back rank against promotions (number)
+    """
+
+    _tables = {}
+
+    def __init__(self, man=1, king=2, advancement=0, center=0, back_rank=0):
+        self.man = man
+        self.king = king
+        self.advancement = advancement
+        self.center = center
+        self.back_rank = back_rank
+
+    def weights(self):
+        return self.man, self.king, self.advancement, self.center, self.back_rank
+
+    def tables(self, width):
+        """
+        Get values of pieces on every square of the board of the given width.
+        :param width: width of the board (int)
+        :return: tuple of tables for player1 man, player1 king, player2 man, player2 king;
+            a table is a tuple of values for squares numbered row * width + col, values of
+            player2 pieces are negative
+        """
+        key = self.weights(), width
+        tables = type(self)._tables.get(key)
+        if tables is None:
+            men = ([], [])
+            kings = ([], [])
+            for square in range(width * width):
+                row, col = divmod(square, width)
+                ring = min(row, col, width - 1 - row, width - 1 - col)
+                for side, advanced in ((0, row), (1, width - 1 - row)):
+                    sign = 1 if side == 0 else -1
+                    men[side].append(
+                        sign
+                        * (
+                            self.man
+                            + self.advancement * advanced
+                            + self.center * ring
+                            + self.back_rank * (advanced == 0)
+                        )
+                    )
+                    kings[side].append(sign * (self.king + self.center * ring))
+            tables = tuple(men[0]), tuple(kings[0]), tuple(men[1]), tuple(kings[1])
+            type(self)._tables[key] = tables
+        return tables
+
+    def __eq__(self, other):
+        return isinstance(other, Evaluation) and self.weights() == other.weights()
+
+    def __hash__(self):
+        return hash(self.weights())
+
+    def __deepcopy__(self, memo):
+        # weights are never changed, copies of the game share them
+        return self
+
+    def __repr__(self):
+        return (
+            f"Evaluation(man={self.man}, king={self.king}, "
+            f"advancement={self.advancement}, center={self.center}, "
+            f"back_rank={self.back_rank})"
+        )
@@ -39,3 +39,11 @@ class ImpossibleMoveException(WrongMoveException):
 class NotYourCellException(WrongMoveException):
     def __str__(self):
         return f"[{self.move}] Cell contains enemy's piece."
+
+
+class SearchCancelled(Exception):
+    def __init__(self, reason):
+        self.reason = reason
+
+    def __str__(self):
+        return f"Search cancelled: {self.reason}."
@@ -1,17 +1,18 @@
 #!/usr/bin/python3
 
+import argparse
+import json
 import sys
 from TextCheckers import TextCheckers
-from alphabeta import alphabeta
 from components import Piece
-from State import State
+from tablebase import Tablebase
+from book import OpeningBook
+from analysis import analyse_stream
 
 
 def set_piece(game, place, player):
     """Helper function. Put new piece on the given  position."""
-    row, col = place
-    game.board[row][col].piece = Piece(player)
-    player.pieces.add(game.board[row][col].piece)
+    game.put_piece(place, Piece(player))
 
 
 def test_particular_situation():
@@ -19,7 +20,7 @@ def test_particular_situation():
     """
     # king beats 5 pieces - 2 possible attacks
     set_piece(game, (0, 1), game.player1)
-    game.board[0][1].piece.set_king()
+    game.set_king((0, 1))
     set_piece(game, (1, 2), game.player2)
     set_piece(game, (1, 4), game.player2)
     set_piece(game, (1, 6), game.player2)
@@ -46,7 +47,7 @@ def test_particular_situation():
     # '''
     # king cannot jump over the same piece two times in the same round - ai wins
     set_piece(game, (0, 3), game.player1)
-    game.board[0][3].piece.set_king()
+    game.set_king((0, 3))
     set_piece(game, (1, 2), game.player1)
     set_piece(game, (2, 5), game.player2)
     set_piece(game, (4, 3), game.player2)
@@ -85,20 +86,24 @@ def game_loop(game):
             if game.is_end_of_game():
                 break
 
-            state = State(game)
-            alphabeta(state, 3)
-            state.apply_moves(game)
+            moves = game.ai_move()
+            if moves is not None:
+                for move in moves:
+                    game.move(*move)
 
             print(f"{game.player2} moved: ", end="")
-            if state.next is not None:
-                if len(state.next.moves) > 0:
-                    print(game.tr_back(state.next.moves[0][0]), end="")
-                for _move in state.next.moves:
+            if moves is not None:
+                if len(moves) > 0:
+                    print(game.tr_back(moves[0][0], width=game.board.width), end="")
+                for _move in moves:
                     _, dest = _move
-                    print(f" -> {game.tr_back(dest)}", end="")
+                    print(f" -> {game.tr_back(dest, width=game.board.width)}", end="")
                 print()
+            if game.last_search is not None:
+                print(game.last_search.report())
 
             game.next_player()
+            game.start_pondering()
         except KeyboardInterrupt:
             print(f"{game.player1} score: {game.get_score(game.player1)}")
             print("Exiting...")
@@ -106,18 +111,113 @@ def game_loop(game):
         except Exception as e:
             print(e)
             break
-
-
-def main():
+    game.stop_pondering()
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Checkers game with an AI opponent.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes searching the AI moves in parallel",
+    )
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=TextCheckers.default_width,
+        help="width of the board, ex. 10 for international draughts",
+    )
+    parser.add_argument(
+        "--tablebase",
+        metavar="PATH",
+        help="endgame tablebase built by tablebase.py, probed by the AI",
+    )
+    parser.add_argument(
+        "--book",
+        metavar="PATH",
+        help="opening book built by book.py, played by the AI",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print statistics of the search after every AI move",
+    )
+    parser.add_argument(
+        "--ponder",
+        action="store_true",
+        help="let the AI think while waiting for your moves",
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help="analyse positions of the file (- or nothing for stdin) without the text "
+        "interface, one per line, and print results as JSON lines",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=None, help="maximum depth of batch searches"
+    )
+    parser.add_argument(
+        "--time", type=float, default=None, help="time of a batch search [s]"
+    )
+    return parser.parse_args(argv)
+
+
+def batch(arguments, out=sys.stdout):
+    """
+    Analyse positions of the --batch input and print a JSON line for each of them.
+    :param arguments: parsed arguments of the command line
+    :return: exit code - 1 if a position could not be read
+    """
+    tablebase = None if arguments.tablebase is None else Tablebase(arguments.tablebase)
+    source = sys.stdin if arguments.batch == "-" else open(arguments.batch)
+    errors = 0
+    try:
+        for result in analyse_stream(
+            source,
+            arguments.workers,
+            depth=arguments.depth,
+            time_limit=arguments.time,
+            tablebase=tablebase,
+        ):
+            errors += "error" in result
+            print(json.dumps(result), file=out, flush=True)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 1 if errors else 0
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    if arguments.batch is not None:
+        return batch(arguments)
     print("Welcome to TextCheckers game by Krzysztof Grajda!\n")
-    c = TextCheckers("me", "ai")
+    c = TextCheckers("me", "ai", width=arguments.width)
+    c.ai_workers = arguments.workers
+    c.ai_stats = arguments.stats
+    c.ai_ponder = arguments.ponder
+    if arguments.tablebase is not None:
+        c.ai_tablebase = Tablebase(arguments.tablebase)
+    if arguments.book is not None:
+        c.ai_book = OpeningBook(arguments.book)
 
     try:
-        c.ai_depth = int(input("Maximum depth of the alpha-beta algorithm: "))
+        depth = input(
+            "Maximum depth of the alpha-beta algorithm (empty for no limit): "
+        )
+        c.ai_depth = int(depth) if depth.strip() else None
+    except Exception as e:
+        print(e)
+        print(f"Assuming default value of depth: {c.ai_depth}")
+    try:
+        c.ai_time = float(input("Time for a move of the alpha-beta algorithm [s]: "))
         print()
     except Exception as e:
         print(e)
-        print(f"Assuming default value of depth: {c.ai_depth}\n")
+        print(f"Assuming default value of time: {c.ai_time}\n")
 
     print('Type "q", "quit" or "exit" to terminate program at any point in time.')
     print('Type "p", "h" or "help" to get possible moves.\n')
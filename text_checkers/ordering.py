@@ -0,0 +1,84 @@
+import random
+
+
+class MoveOrdering:
+    """
+    A class that orders moves of the alpha-beta search before they are searched. A move is
+    ranked by its first step: the move of the transposition table (the principal variation)
+    goes first, then moves capturing more pieces, promotions, killer moves of the ply and
+    finally steps with the best history.
+
+    class variables:
+        killers_per_ply - number of killer moves kept for every ply
+
+    attributes:
+        killers - steps which caused a cutoff, for every ply the latest first (list of lists)
+        history - score of steps which caused cutoffs, increased by depth squared (dict
+            (origin, destination) -> int),
+        random - generator breaking ties between equally ranked steps at random, used to
+            make parallel searches differ (None or class random.Random)
+    """
+
+    killers_per_ply = 2
+
+    def __init__(self, seed=None):
+        self.killers = []
+        self.history = {}
+        self.random = None if seed is None else random.Random(seed)
+
+    def new_search(self):
+        """Forget killer moves and age the history before a search of a new position."""
+        self.killers = []
+        for step in self.history:
+            self.history[step] //= 2
+
+    def key(self, game, ply):
+        """
+        Get a sort key of moves of the game (greater keys go first).
+        :param game: game (class Checkers)
+        :param ply: distance from the root of the search (int)
+        :return: function move (class MovePath) -> tuple
+        """
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+        width = game.board.width
+        last_row = width - 1
+        tie_break = self.random.random if self.random is not None else float
+
+        def rank(path):
+            step = path.steps[0]
+            (row, col), (dest_row, _) = step
+            piece = game.board.pieces[row * width + col]
+            promotion = not piece.is_king() and dest_row == (
+                last_row if piece.parent == game.player1 else 0
+            )
+            killer = (
+                type(self).killers_per_ply - killers.index(step)
+                if step in killers
+                else 0
+            )
+            return (
+                path.captured.bit_count(),
+                promotion,
+                killer,
+                history.get(step, 0),
+                tie_break(),
+            )
+
+        return rank
+
+    def cutoff(self, step, ply, depth):
+        """
+        Remember a step which caused a cutoff.
+        :param step: first step of the move (tuple of positions: origin, destination)
+        :param ply: distance from the root of the search (int)
+        :param depth: depth of the search below the step (int)
+        """
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if step in killers:
+            killers.remove(step)
+        killers.insert(0, step)
+        del killers[type(self).killers_per_ply :]
+        self.history[step] = self.history.get(step, 0) + depth * depth
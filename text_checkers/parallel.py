@@ -0,0 +1,121 @@
+import copy
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+from alphabeta import SearchLimits, iterative_deepening, principal_variation
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+
+def parallel_search(
+    game,
+    workers=2,
+    max_depth=None,
+    time_limit=None,
+    node_limit=None,
+    table_mb=64,
+    tablebase=None,
+):
+    """
+    Lazy SMP search. Worker processes run iterative deepening on the same position and
+    share one transposition table in shared memory, so every worker uses the bounds and best
+    moves found by the others. Helpers break ties of the move ordering at random to search
+    other subtrees first. When worker 0 completes its search the helpers are stopped.
+    :param game: game to search (class Checkers), left as it was given
+    :param workers: number of worker processes (int), 1 searches in this process
+    :param max_depth: maximum depth of every worker (int, optional)
+    :param time_limit: time budget in seconds (float, optional)
+    :param node_limit: budget of nodes of every worker (int, optional)
+    :param table_mb: memory of the transposition table in megabytes
+    :param tablebase: endgame tablebase probed by every worker, workers map its file on
+        their own (class Tablebase, optional)
+    :return: tuple (score of the player1, the best move as a list of steps or None, depth of
+        the deepest completed iteration, principal variation - a list of moves, number of
+        nodes of all workers)
+    """
+    if workers <= 1:
+        table = TranspositionTable(table_mb)
+        limits = SearchLimits(time_limit, node_limit)
+        score, moves, depth = iterative_deepening(
+            game, max_depth, table=table, limits=limits, tablebase=tablebase
+        )
+        return score, moves, depth, principal_variation(game, table), limits.nodes
+    shared = shared_memory.SharedMemory(create=True, size=int(table_mb * 2**20))
+    context = multiprocessing.get_context()
+    stop = context.Event()
+    results = context.Queue()
+    search_game = copy.deepcopy(game)
+    search_game.history.clear()
+    processes = [
+        context.Process(
+            target=_worker,
+            args=(
+                index,
+                search_game,
+                shared.name,
+                (max_depth, time_limit, node_limit),
+                tablebase,
+                stop,
+                results,
+            ),
+            daemon=True,
+        )
+        for index in range(workers)
+    ]
+    try:
+        for process in processes:
+            process.start()
+        collected = {}
+        while len(collected) < workers:
+            try:
+                index, result = results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break
+                continue
+            collected[index] = result
+            if index == 0:
+                stop.set()
+        if not collected:
+            raise RuntimeError("No worker of the parallel search finished.")
+        # the deepest search wins, worker 0 on equal depth
+        best = max(collected, key=lambda i: (collected[i][2], i == 0))
+        score, moves, depth, _ = collected[best]
+        table = TranspositionTable(buffer=shared.buf)
+        line = principal_variation(game, table)
+        del table
+        nodes = sum(result[3] for result in collected.values())
+        return score, moves, depth, line, nodes
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+        shared.close()
+        shared.unlink()
+
+
+def _worker(index, game, shared_name, limits, tablebase, stop, results):
+    """
+    Function used internally. Search of a single worker of parallel_search.
+    :param limits: tuple (max_depth, time_limit, node_limit)
+    """
+    max_depth, time_limit, node_limit = limits
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        table = TranspositionTable(buffer=shared.buf)
+        ordering = MoveOrdering(seed=index if index else None)
+        search_limits = SearchLimits(time_limit, node_limit, stop)
+        score, moves, depth = iterative_deepening(
+            game,
+            max_depth,
+            table=table,
+            ordering=ordering,
+            limits=search_limits,
+            tablebase=tablebase,
+        )
+        results.put((index, (score, moves, depth, search_limits.nodes)))
+        del table
+    finally:
+        shared.close()
@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+
+import argparse
+import sys
+import time
+from State import State, BitboardState
+from positions import positions, build_position
+from selfplay import move_text
+
+# Number of leaves of the move tree at depth 1, 2, 3... of the fixed positions. A move is
+# a complete turn (all jumps of a multi-jump included); the tree ends where the game does.
+reference_counts = {
+    "start": [7, 49, 302, 1469, 7482, 37976, 190020],
+    "king_captures_five": [2, 0, 0],
+    "promotion_two_moves": [2, 2, 9, 7, 30, 49, 355, 446, 2699, 4690],
+    "promotion_blocked_by_capture": [1, 2, 4, 6, 9, 18, 94, 119, 672, 1162],
+    "king_no_double_jump": [1, 1, 0],
+}
+
+
+def perft_in_place(game, depth):
+    """
+    Count leaves of the move tree of the game walked in place with make/undo.
+    :param game: game (class Checkers), left as it was given
+    :param depth: depth of the tree
+    :return: number of leaves (int)
+    """
+    if depth == 0:
+        return 1
+    if game.is_end_of_game():
+        return 0
+    nodes = 0
+    for _ in game.play_moves():
+        nodes += perft_in_place(game, depth - 1)
+    return nodes
+
+
+def perft_states(state, depth):
+    """
+    Count leaves of the move tree built from copies of the game by State.get_children.
+    :param state: state (class State or a class extending it)
+    :param depth: depth of the tree
+    :return: number of leaves (int)
+    """
+    if depth == 0:
+        return 1
+    if state.is_end_of_game():
+        return 0
+    return sum(perft_states(child, depth - 1) for child in state.get_children())
+
+
+def _in_place_root(game, depth):
+    for moves in game.play_moves():
+        yield list(moves), perft_in_place(game, depth - 1)
+
+
+def _states_root(state_class):
+    def root(game, depth):
+        for child in state_class(game).get_children():
+            yield child.moves, perft_states(child, depth - 1)
+
+    return root
+
+
+# ways of walking the tree: name -> function(game, depth) yielding (move, leaves under it)
+generators = {
+    "checkers": _in_place_root,
+    "state": _states_root(State),
+    "bitboard": _states_root(BitboardState),
+}
+
+
+def divide(game, depth, generator="checkers"):
+    """
+    Count leaves of the move tree split by moves of the root.
+    :param game: game (class Checkers)
+    :param depth: depth of the tree, at least 1
+    :param generator: key of generators (str)
+    :return: a list of tuples (move as text, number of leaves) sorted by moves
+    """
+    if depth < 1:
+        raise ValueError("Perft needs a depth of at least 1.")
+    if game.is_end_of_game():
+        return []
+    return sorted(
+        (move_text(moves, game.board.width), nodes)
+        for moves, nodes in generators[generator](game, depth)
+    )
+
+
+def perft(game, depth, generator="checkers"):
+    """Count leaves of the move tree, see divide."""
+    if depth == 0:
+        return 1
+    return sum(nodes for _, nodes in divide(game, depth, generator))
+
+
+def check(generator="checkers", max_depth=None, out=sys.stdout):
+    """
+    Compare counts of the generator with reference_counts.
+    :param max_depth: the deepest compared depth (int, optional - every reference count)
+    :return: number of wrong counts (int)
+    """
+    errors = 0
+    for name, counts in reference_counts.items():
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            start = time.perf_counter()
+            nodes = perft(build_position(name), depth, generator)
+            elapsed = time.perf_counter() - start
+            if nodes != expected:
+                errors += 1
+            print(
+                f"{name:<30}{depth:>6}{nodes:>12}{expected:>12}"
+                f"{nodes / elapsed if elapsed else 0:>12.0f}"
+                f"{'' if nodes == expected else '  WRONG'}",
+                file=out,
+            )
+    return errors
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Count leaves of the move tree (perft) of a fixed position."
+    )
+    parser.add_argument("position", nargs="?", default="start", choices=positions)
+    parser.add_argument("depth", nargs="?", type=int, default=4)
+    parser.add_argument(
+        "--generator", default="checkers", choices=generators, help="move generator"
+    )
+    parser.add_argument(
+        "--divide", action="store_true", help="count leaves for every root move"
+    )
+    parser.add_argument(
+        "--check",
+        type=int,
+        nargs="?",
+        const=0,
+        metavar="DEPTH",
+        help="compare every position with the reference counts (up to the depth)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    if arguments.check is not None:
+        print(
+            f"{'position':<30}{'depth':>6}{'nodes':>12}{'expected':>12}{'nodes/s':>12}"
+        )
+        return 1 if check(arguments.generator, arguments.check or None) else 0
+    game = build_position(arguments.position)
+    start = time.perf_counter()
+    if arguments.divide:
+        counts = divide(game, arguments.depth, arguments.generator)
+        for move, nodes in counts:
+            print(f"{move:<24}{nodes:>12}")
+        nodes = sum(nodes for _, nodes in counts)
+    else:
+        nodes = perft(game, arguments.depth, arguments.generator)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{arguments.position} depth {arguments.depth}: {nodes} nodes in "
+        f"{elapsed:.3f} s ({nodes / elapsed if elapsed else 0:.0f} nodes/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import copy
+import multiprocessing
+import queue
+import signal
+import time
+from multiprocessing import shared_memory
+from alphabeta import SearchLimits, SearchResult, iterative_deepening
+from alphabeta import principal_variation
+from transposition import TranspositionTable
+
+
+class Ponder:
+    """
+    A class representing a search run in a background process on the opponent's time.
+
+    The process searches the position after the predicted reply of the opponent (or the
+    position of the opponent itself when there is no prediction, which fills the
+    transposition table for all replies) until it is stopped. Its transposition table is
+    in shared memory, so the search made after a wrong prediction starts from it too. Given
+    a table of the game, the shared one starts as its copy and is copied back on close.
+
+    attributes:
+        target - hash of the position searched by the process, None when the position of
+            the opponent is searched (None or int),
+        table - transposition table shared with the process (class TranspositionTable),
+        started - value of time.monotonic() when the process started (float),
+        best - the last completed iteration: tuple (depth, score, best move, principal
+            variation) (None or tuple),
+        finished - whether the process completed its search (bool)
+    """
+
+    def __init__(
+        self,
+        game,
+        predicted=None,
+        max_depth=None,
+        table_mb=16,
+        tablebase=None,
+        table=None,
+    ):
+        """
+        Start pondering.
+        :param game: game of the opponent to move (class Checkers), left as it was given
+        :param predicted: predicted move of the opponent (list of steps, optional)
+        :param max_depth: maximum depth of the search (int, optional)
+        :param table_mb: memory of the transposition table in megabytes
+        :param tablebase: endgame tablebase probed by the search (class Tablebase, optional)
+        :param table: transposition table of the game, table_mb is its size then (class
+            TranspositionTable, optional)
+        """
+        search_game = copy.deepcopy(game)
+        search_game.history.clear()
+        self.target = None
+        if predicted is not None:
+            for step in predicted:
+                search_game.move(*step)
+            search_game.next_player()
+            search_game.history.clear()
+            self.target = search_game.hash
+        self._session = table
+        size = int(table_mb * 2**20) if table is None else len(table.buffer)
+        self._shared = shared_memory.SharedMemory(create=True, size=size)
+        if table is not None:
+            self._shared.buf[:size] = table.buffer
+        self.table = TranspositionTable(buffer=self._shared.buf)
+        if table is not None:
+            self.table.age = table.age
+        context = multiprocessing.get_context()
+        self._stop = context.Event()
+        self._results = context.Queue()
+        self.best = None
+        self.finished = False
+        self._process = context.Process(
+            target=_worker,
+            args=(
+                search_game,
+                self._shared.name,
+                self.table.age,
+                max_depth,
+                tablebase,
+                self._stop,
+                self._results,
+            ),
+            daemon=True,
+        )
+        self.started = time.monotonic()
+        self._process.start()
+
+    def _collect(self, timeout=0):
+        """Function used internally. Read results of the process, wait up to timeout."""
+        while not self.finished:
+            try:
+                result = self._results.get(timeout=timeout)
+            except queue.Empty:
+                return
+            if result is None:
+                self.finished = True
+            else:
+                self.best = result
+            timeout = 0
+
+    def answer(self, game, time_limit=None):
+        """
+        Get the move of the position of the game if it is the one pondered on. The search
+        goes on until the time budget counted from the start of pondering runs out, then
+        it is stopped.
+        :param game: game after the move of the opponent (class Checkers)
+        :param time_limit: time budget in seconds (float, optional - no waiting)
+        :return: tuple (best move - a list of steps, principal variation - a list of
+            moves) or None if the position was not predicted
+        """
+        if self.target is None or game.hash != self.target:
+            self.stop()
+            return None
+        deadline = self.started + (time_limit or 0)
+        while not self.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and self.best is not None:
+                break
+            self._collect(max(remaining, 0.01))
+        self.stop()
+        if self.best is None or self.best[2] is None:
+            return None
+        _, _, moves, line = self.best
+        if moves not in [list(_moves) for _moves in game.play_moves()]:
+            # a collision of hashes
+            return None
+        return moves, line
+
+    def stop(self):
+        """Stop the process, the transposition table stays until close."""
+        self._stop.set()
+        deadline = time.monotonic() + 1
+        while self._process.is_alive() and time.monotonic() < deadline:
+            # the process exits only when its results are read
+            self._collect(0.01)
+            self._process.join(0.01)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._collect()
+
+    def close(self):
+        """Stop the process, copy the table back and free the shared memory."""
+        self.stop()
+        if self._session is not None:
+            self._session.buffer[:] = self._shared.buf[: len(self._session.buffer)]
+            self._session.age = self.table.age
+        self.table = None
+        self._shared.close()
+        self._shared.unlink()
+
+
+def _worker(game, shared_name, age, max_depth, tablebase, stop, results):
+    """
+    Function used internally. Search of the pondering process, every completed iteration
+    is sent as a tuple (depth, score, best move, principal variation), None at the end.
+    """
+    # Ctrl-C in the terminal reaches every process, the game stops this one on its own
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        table = TranspositionTable(buffer=shared.buf)
+        table.age = age
+
+        def iteration(stats):
+            line = principal_variation(game, table)
+            results.put((stats.depth, stats.score, stats.moves, line))
+
+        iterative_deepening(
+            game,
+            max_depth,
+            table=table,
+            limits=SearchLimits(stop=stop),
+            tablebase=tablebase,
+            stats=SearchResult(on_iteration=iteration),
+        )
+        results.put(None)
+        del table
+    finally:
+        shared.close()
@@ -0,0 +1,135 @@
+from Checkers import Checkers
+from components import Piece
+
+# Fixed positions used by benchmarks and reference tables.
+# A position is a list of pieces (row, column, player index - 0 for player1, is king) and
+# the index of the player to move; None stands for the starting arrangement.
+positions = {
+    "start": (None, 0),
+    # king beats 5 pieces - 2 possible attacks
+    "king_captures_five": (
+        [
+            (0, 1, 0, True),
+            (1, 2, 1, False),
+            (1, 4, 1, False),
+            (1, 6, 1, False),
+            (6, 1, 1, False),
+            (6, 3, 1, False),
+        ],
+        0,
+    ),
+    # 2 possible moves - changed to king
+    "promotion_two_moves": (
+        [(3, 4, 0, False), (4, 3, 1, False), (6, 1, 1, False), (6, 3, 1, False)],
+        0,
+    ),
+    # piece not changed to king
+    "promotion_blocked_by_capture": (
+        [(5, 2, 0, False), (6, 1, 1, False), (6, 3, 1, False), (6, 5, 1, False)],
+        0,
+    ),
+    # king cannot jump over the same piece two times in the same round
+    "king_no_double_jump": (
+        [
+            (0, 3, 0, True),
+            (1, 2, 0, False),
+            (2, 5, 1, False),
+            (4, 3, 1, False),
+            (4, 5, 1, False),
+            (5, 6, 1, False),
+            (6, 3, 1, False),
+        ],
+        0,
+    ),
+    "opening": (
+        [
+            (0, 1, 0, False),
+            (0, 3, 0, False),
+            (0, 5, 0, False),
+            (0, 7, 0, False),
+            (1, 0, 0, False),
+            (1, 2, 0, False),
+            (1, 6, 0, False),
+            (2, 5, 0, False),
+            (3, 4, 1, False),
+            (4, 1, 1, False),
+            (5, 0, 1, False),
+            (5, 2, 1, False),
+            (6, 1, 1, False),
+            (6, 3, 1, False),
+            (6, 5, 1, False),
+            (6, 7, 1, False),
+            (7, 0, 1, False),
+            (7, 2, 1, False),
+            (7, 4, 1, False),
+        ],
+        0,
+    ),
+    "middlegame": (
+        [
+            (0, 1, 0, False),
+            (0, 5, 0, False),
+            (0, 7, 0, False),
+            (1, 0, 0, False),
+            (2, 1, 0, False),
+            (2, 5, 0, False),
+            (4, 1, 1, False),
+            (4, 5, 1, False),
+            (5, 0, 1, False),
+            (5, 2, 1, False),
+            (6, 1, 1, False),
+            (7, 0, 1, False),
+            (7, 2, 1, False),
+            (7, 4, 1, False),
+        ],
+        0,
+    ),
+    "endgame": (
+        [
+            (1, 4, 0, False),
+            (2, 5, 0, False),
+            (3, 0, 0, False),
+            (4, 1, 1, False),
+            (4, 5, 1, False),
+            (5, 0, 1, False),
+            (5, 2, 1, False),
+            (6, 1, 1, False),
+            (6, 5, 1, False),
+            (7, 2, 1, False),
+        ],
+        0,
+    ),
+    "king_endgame": (
+        [
+            (3, 2, 0, True),
+            (5, 4, 0, True),
+            (0, 5, 1, True),
+            (6, 1, 1, True),
+            (2, 7, 1, False),
+        ],
+        0,
+    ),
+}
+
+
+def build_position(name, game_class=Checkers, **kwargs):
+    """
+    Create a game holding one of the fixed positions.
+    :param name: key of positions (str)
+    :param game_class: class of the game (Checkers or a class extending it)
+    :param kwargs: arguments of the game class
+    :return: game
+    """
+    pieces, current = positions[name]
+    if pieces is None:
+        return game_class(**kwargs)
+    game = game_class(arrange_pieces=False, **kwargs)
+    players = (game.player1, game.player2)
+    for row, col, player, king in pieces:
+        piece = Piece(players[player])
+        if king:
+            piece.set_king()
+        game.put_piece((row, col), piece)
+    game.current_player = players[current]
+    game.hash = game.compute_hash()
+    return game
@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import random
+import sys
+import time
+from Checkers import Checkers, BitboardCheckers
+from TextCheckers import TextCheckers
+from alphabeta import iterative_deepening
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+
+def parse_move(text, width=Checkers.default_width):
+    """
+    Translate a move written as text coordinates, ex. "c3->e5->c7", to steps.
+    :param text: move (str)
+    :param width: width of the board (int)
+    :return: a list of steps (tuples of positions: origin, destination)
+    """
+    places = [TextCheckers.tr(place, width) for place in text.lower().split("->")]
+    if len(places) < 2:
+        raise ValueError(f"Incorrect move: {text}")
+    return list(zip(places[:-1], places[1:]))
+
+
+def move_text(moves, width=Checkers.default_width):
+    """Translate steps of a move to text coordinates, ex. "c3->e5->c7"."""
+    return "->".join(
+        [TextCheckers.tr_back(moves[0][0], width=width)]
+        + [TextCheckers.tr_back(dest, width=width) for _, dest in moves]
+    )
+
+
+def read_openings(path, width=Checkers.default_width):
+    """
+    Read openings, one per line: moves separated by whitespaces. Empty lines and lines
+    starting with # are skipped.
+    :param path: path of the file (str)
+    :param width: width of the board (int)
+    :return: a list of openings (lists of moves)
+    """
+    openings = []
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                openings.append([parse_move(move, width) for move in line.split()])
+    return openings
+
+
+def position(game):
+    """Compact form of the position: [pieces of player1, pieces of player2, kings, player to move]."""
+    bitboard = BitboardCheckers.from_checkers(game)
+    return [bitboard.pieces[0], bitboard.pieces[1], bitboard.kings, bitboard.current]
+
+
+def play_game(task):
+    """
+    Play a single game of the AI against itself.
+    :param task: tuple (index of the game, opening - a list of moves or None, settings -
+        dict of arguments of the command line)
+    :return: dict - record of the game: index, result ("1-0", "0-1", "1/2-1/2" or "*" for
+        an unfinished game) and plies, a ply is [*position, move, score of the search]
+    """
+    index, opening, settings = task
+    rng = random.Random(settings["seed"] * 1000003 + index)
+    game = Checkers(board_arguments={"width": settings["width"]})
+    table = TranspositionTable(settings["table_mb"])
+    ordering = MoveOrdering()
+    plies = []
+
+    def play(moves, score):
+        plies.append(position(game) + [move_text(moves, game.board.width), score])
+        for step in moves:
+            game.move(*step)
+        game.next_player()
+
+    for moves in opening or ():
+        legal = [list(_moves) for _moves in game.play_moves()]
+        if moves not in legal:
+            raise ValueError(
+                f"Game {index}: illegal opening move "
+                f"{move_text(moves, game.board.width)}"
+            )
+        play(moves, None)
+    for _ in range(settings["random_plies"]):
+        if game.is_end_of_game():
+            break
+        legal = [list(_moves) for _moves in game.play_moves()]
+        if not legal:
+            break
+        play(rng.choice(legal), None)
+    while len(plies) < settings["max_plies"] and not game.is_end_of_game():
+        score, moves, _ = iterative_deepening(
+            game,
+            max_depth=settings["depth"],
+            time_limit=settings["time"],
+            node_limit=settings["nodes"],
+            table=table,
+            ordering=ordering,
+        )
+        if moves is None:
+            break
+        play(moves, score)
+    if not game.is_end_of_game():
+        result = "*"
+    elif game.winner is None:
+        result = "1/2-1/2"
+    else:
+        result = "1-0" if game.winner == game.player1 else "0-1"
+    return {"game": index, "result": result, "plies": plies}
+
+
+def self_play(
+    output,
+    games,
+    workers=None,
+    openings=None,
+    depth=4,
+    time_limit=None,
+    node_limit=None,
+    max_plies=200,
+    random_plies=0,
+    seed=0,
+    table_mb=4,
+    width=Checkers.default_width,
+):
+    """
+    Play games of the AI against itself in a pool of processes and write every finished
+    game as a line of JSON to the output (compressed when the name ends with ".gz").
+    :param output: path of the output file (str)
+    :param games: number of games (int)
+    :param workers: number of processes (int, optional - number of CPUs)
+    :param openings: openings played before the AI takes over, game i plays opening
+        i % len(openings) (list of lists of moves, optional)
+    :return: dict - number of games of every result
+    """
+    settings = {
+        "depth": depth,
+        "time": time_limit,
+        "nodes": node_limit,
+        "max_plies": max_plies,
+        "random_plies": random_plies,
+        "seed": seed,
+        "table_mb": table_mb,
+        "width": width,
+    }
+    tasks = (
+        (index, openings[index % len(openings)] if openings else None, settings)
+        for index in range(games)
+    )
+    results = {}
+    opener = gzip.open if output.endswith(".gz") else open
+    with opener(output, "wt") as file, multiprocessing.Pool(workers) as pool:
+        for record in pool.imap_unordered(play_game, tasks):
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            results[record["result"]] = results.get(record["result"], 0) + 1
+    return results
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Play games of the AI against itself without the text interface."
+    )
+    parser.add_argument("output", help="output file (JSON lines, .gz to compress)")
+    parser.add_argument("--games", type=int, default=100, help="number of games")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes")
+    parser.add_argument("--openings", help="file of openings, one per line")
+    parser.add_argument("--depth", type=int, default=4, help="maximum search depth")
+    parser.add_argument("--time", type=float, default=None, help="time per move [s]")
+    parser.add_argument("--nodes", type=int, default=None, help="nodes per move")
+    parser.add_argument("--max-plies", type=int, default=200, help="plies per game")
+    parser.add_argument(
+        "--random-plies", type=int, default=0, help="random moves at the start"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random moves")
+    parser.add_argument(
+        "--width", type=int, default=Checkers.default_width, help="width of the board"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    openings = (
+        read_openings(arguments.openings, arguments.width)
+        if arguments.openings
+        else None
+    )
+    start = time.perf_counter()
+    results = self_play(
+        arguments.output,
+        arguments.games,
+        arguments.workers,
+        openings,
+        arguments.depth,
+        arguments.time,
+        arguments.nodes,
+        arguments.max_plies,
+        arguments.random_plies,
+        arguments.seed,
+        width=arguments.width,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{arguments.games} games in {elapsed:.1f} s "
+        f"({arguments.games * 3600 / elapsed:.0f} games/hour): {results}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
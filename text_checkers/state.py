@@ -1,4 +1,4 @@
-from Checkers import Checkers
+from Checkers import Checkers, BitboardCheckers
 import copy
 
 
@@ -14,6 +14,7 @@ class State:
 
     def __init__(self, game: Checkers):
         self.game = copy.deepcopy(game)  # copy the board and players as new objects
+        self.game.history.clear()  # searched copies never take back the moves made before
         self.next = None
         self.moves = []
 
@@ -27,46 +28,24 @@ class State:
         return self.game.current_player == self.game.player1
 
     def get_children(self):
-        moves = self.game.get_possible_moves(self.game.current_player)
-        children = []
-        for move in moves:
-            current_pos, dest_pos = move
-            child = copy.deepcopy(self)
-            # move method return value tells whether the player must continue the move
-            still_moving = child.game.move(current_pos, dest_pos)
-            child.moves.append((current_pos, dest_pos))
-            while still_moving:
-                current_pos = dest_pos
-                _moves = child.game.possible_moves(current_pos)
-                dest_pos = _moves[0]
-                if len(_moves) > 1:
-                    for _move in _moves[1:]:
-                        another_child = copy.deepcopy(child)
-                        type(self)._add_another_move(
-                            children, another_child, current_pos, _move
-                        )
-                still_moving = child.game.move(current_pos, dest_pos)
-                child.moves.append((current_pos, dest_pos))
+        return [child for _, child in self.iter_children()]
+
+    def iter_children(self):
+        """
+        Iterate over the children lazily: a child is copied only when the iteration gets to
+        it, so a search cut off after the first child never pays for the others.
+        :return: generator of tuples (steps of the move, child state)
+        """
+        # a multi-jump sequence is a single move made at once, so it needs a single copy
+        for path in self.game.move_paths():
+            child = type(self).__new__(type(self))
+            child.game = copy.deepcopy(self.game)
+            child.game.apply_path(path)
             child.game.next_player()
-            children.append(child)
-        return children
-
-    @classmethod
-    def _add_another_move(cls, list_of_children, child, current_pos, dest_pos):
-        still_moving = child.game.move(current_pos, dest_pos)
-        child.moves.append((current_pos, dest_pos))
-        while still_moving:
-            moves = child.game.possible_moves(current_pos)
-            if len(moves) > 1:
-                for move in moves[1:]:
-                    another_child = copy.deepcopy(child)
-                    cls._add_another_move(
-                        list_of_children, another_child, current_pos, move
-                    )
-            still_moving = child.game.move(current_pos, dest_pos)
-            child.moves.append((current_pos, dest_pos))
-        child.game.next_player()
-        list_of_children.append(child)
+            child.game.history.clear()
+            child.next = None
+            child.moves = self.moves + path.steps
+            yield path.steps, child
 
     def apply_moves(self, game):
         state = self
@@ -79,3 +58,40 @@ class State:
 
     def __repr__(self):
         return f"state: {self.game.__repr__()}"
+
+
+class BitboardState(State):
+    """
+    A class that holds a complete copy of the Checkers game stored in bitboards.
+    Children are built from whole moves (multi-jump sequences included) generated by
+    BitboardCheckers, so every child costs a single copy of a few ints.
+
+    attributes:
+        game - copy of the game (class BitboardCheckers)
+        next - a state assigned in an alphabeta algorithm as the best child state
+        moves - a list of moves to achieve the given state from the primary state (primary state holds an empty list)
+    """
+
+    def __init__(self, game):
+        if isinstance(game, BitboardCheckers):
+            self.game = game.copy()
+        else:
+            self.game = BitboardCheckers.from_checkers(game)
+        self.next = None
+        self.moves = []
+
+    def get_score(self):
+        return self.game.get_score(0)
+
+    def is_player1_playing(self):
+        return self.game.current == 0
+
+    def iter_children(self):
+        place = self.game.place
+        for steps, game in self.game.generate_moves():
+            child = type(self).__new__(type(self))
+            child.game = game
+            child.next = None
+            moves = [(place(orig), place(dest)) for orig, dest in steps]
+            child.moves = self.moves + moves
+            yield moves, child
@@ -0,0 +1,440 @@
+#!/usr/bin/python3
+
+import argparse
+import itertools
+import math
+import mmap
+import struct
+import sys
+import time
+from array import array
+from Checkers import Checkers, BitboardCheckers
+
+# Endgame tablebases are solved without the draw after Checkers.draw_amount king moves: the
+# counter is history, not position, and with it every position would need a table for each
+# of its values. A stored win or loss is still exact while the counter of the probed game
+# plus the distance to the end stays within draw_amount (no line of the result is longer),
+# and a stored draw is always exact - the counter rule only turns results into draws.
+
+
+def materials(max_pieces):
+    """
+    Get every material of positions with at most max_pieces pieces, both players having
+    at least one piece.
+    :return: a list of tuples (player1 men, player1 kings, player2 men, player2 kings)
+    """
+    result = []
+    for total in range(2, max_pieces + 1):
+        for counts in itertools.product(range(total + 1), repeat=4):
+            if sum(counts) == total and counts[0] + counts[1] and counts[2] + counts[3]:
+                result.append(counts)
+    return result
+
+
+def material_size(squares, material):
+    """Number of entries of the table of the material, see position_index."""
+    size = 2
+    for count in material:
+        size *= math.comb(squares, count)
+    return size
+
+
+def position_index(squares, groups, side):
+    """
+    Get the index of a position in the table of its material. Every group is ranked in the
+    combinatorial number system on its own, so overlapping groups get (unused) indices too,
+    which keeps the index a few multiplications.
+    :param squares: number of dark squares of the board (int)
+    :param groups: numbers of dark squares of player1 men, player1 kings, player2 men and
+        player2 kings (four iterables of ints)
+    :param side: index of the player to move, 0 for player1 (int)
+    :return: int
+    """
+    index = 0
+    for group in groups:
+        group = sorted(group)
+        rank = 0
+        for i, square in enumerate(group):
+            rank += math.comb(square, i + 1)
+        index = index * math.comb(squares, len(group)) + rank
+    return index * 2 + side
+
+
+def _mask_squares(mask):
+    """Function used internally. Numbers of dark squares of a mask, in increasing order."""
+    squares = []
+    while mask:
+        bit = mask & -mask
+        squares.append((bit.bit_length() - 1) // 2)
+        mask ^= bit
+    return squares
+
+
+def _bitboard_groups(game):
+    """Function used internally. Groups of position_index of a BitboardCheckers game."""
+    men = ~game.kings
+    return (
+        _mask_squares(game.pieces[0] & men),
+        _mask_squares(game.pieces[0] & game.kings),
+        _mask_squares(game.pieces[1] & men),
+        _mask_squares(game.pieces[1] & game.kings),
+    )
+
+
+def _placements(squares, material):
+    """Function used internally. All placements of the groups of the material."""
+    for groups in itertools.product(
+        *(itertools.combinations(range(squares), count) for count in material)
+    ):
+        used = set()
+        for group in groups:
+            used.update(group)
+        if len(used) == sum(material):
+            yield groups
+
+
+class Tablebase:
+    """
+    A class representing an endgame tablebase file opened for probing.
+
+    The file is mapped into memory with mmap and read an entry at a time, so only the pages
+    of probed positions are ever loaded. The file holds a header, a directory of materials
+    and the entries: one little-endian 16-bit word per position of every material, the
+    result for the player to move in the low two bits and the number of moves (turns of
+    both players) to the end of the game above them.
+
+    class variables:
+        UNUSED, DRAW, WIN, LOSS - results of a position for the player to move,
+        magic - first bytes of the file,
+        version - version of the file format,
+        header_format - struct format of the header: magic, version, width of the board,
+            maximum number of pieces, number of materials,
+        material_format - struct format of a directory entry: four counts of the material
+            (see materials), index of its first entry,
+        entry_format - struct format of an entry,
+        win_score - score of a won game, the distance from the root is subtracted from it,
+        win_threshold - scores of at least this size are scores of won games
+
+    attributes:
+        path - path of the file (str),
+        width - width of the board (int),
+        max_pieces - maximum number of pieces of a position in the tablebase (int),
+        squares - number of dark squares of the board (int),
+        offsets - index of the first entry of every material (dict: tuple -> int),
+        data - memory map of the file (class mmap.mmap),
+        data_start - offset of the first entry in the file (int)
+    """
+
+    UNUSED = 0
+    DRAW = 1
+    WIN = 2
+    LOSS = 3
+    magic = b"TCTB"
+    version = 1
+    header_format = struct.Struct("<4sHHHH")
+    material_format = struct.Struct("<BBBBQ")
+    entry_format = struct.Struct("<H")
+    win_score = 10**6
+    win_threshold = win_score // 2
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        cls = type(self)
+        (
+            magic,
+            version,
+            self.width,
+            self.max_pieces,
+            count,
+        ) = cls.header_format.unpack_from(self.data, 0)
+        if magic != cls.magic or version != cls.version:
+            self.data.close()
+            raise ValueError(f"Not a tablebase file of version {cls.version}: {path}")
+        self.squares = self.width * self.width // 2
+        self.offsets = {}
+        position = cls.header_format.size
+        for _ in range(count):
+            *material, offset = cls.material_format.unpack_from(self.data, position)
+            self.offsets[tuple(material)] = offset
+            position += cls.material_format.size
+        self.data_start = position
+
+    @classmethod
+    def write(cls, path, width, max_pieces, offsets, entries):
+        """
+        Write a tablebase file.
+        :param offsets: index of the first entry of every material (dict: tuple -> int)
+        :param entries: entries of all materials (array of unsigned 16-bit ints)
+        """
+        with open(path, "wb") as file:
+            file.write(
+                cls.header_format.pack(
+                    cls.magic, cls.version, width, max_pieces, len(offsets)
+                )
+            )
+            for material, offset in offsets.items():
+                file.write(cls.material_format.pack(*material, offset))
+            if sys.byteorder != "little":
+                entries = array("H", entries)
+                entries.byteswap()
+            entries.tofile(file)
+
+    def probe(self, game):
+        """
+        Find the position of the game at the start of a round.
+        :param game: game (class Checkers)
+        :return: tuple (result for the current player - WIN, LOSS or DRAW, number of moves
+            to the end of the game) or None if the position is not in the tablebase
+        """
+        players = game.player1, game.player2
+        if (
+            len(players[0].pieces) + len(players[1].pieces) > self.max_pieces
+            or game.board.width != self.width
+            or game.must_continue
+        ):
+            return None
+        groups = ([], [], [], [])
+        for side, player in enumerate(players):
+            for piece, (row, col) in player.pieces.items():
+                if not (row + col) % 2:
+                    return None
+                groups[2 * side + piece.is_king()].append((row * self.width + col) // 2)
+        offset = self.offsets.get(tuple(len(group) for group in groups))
+        if offset is None:
+            return None
+        side = 0 if game.current_player == players[0] else 1
+        index = offset + position_index(self.squares, groups, side)
+        (entry,) = type(self).entry_format.unpack_from(
+            self.data, self.data_start + index * type(self).entry_format.size
+        )
+        result = entry & 3
+        if result == type(self).UNUSED:
+            return None
+        return result, entry >> 2
+
+    def score(self, game, ply=0):
+        """
+        Get the exact score of a position found in the tablebase, on the scale of the search:
+        a draw scores the evaluation of the game, like a draw ended by the counter. Ended
+        games are left to the search, so they score the same as without a tablebase.
+        :param game: game (class Checkers)
+        :param ply: distance from the root of the search, shorter wins score higher (int)
+        :return: score of the player1 or None if it is not known
+        """
+        if game.is_end_of_game():
+            return None
+        found = self.probe(game)
+        if found is None:
+            return None
+        result, distance = found
+        if result == type(self).DRAW:
+            return game.get_score(game.player1)
+        if game.king_moves_since_last_attack + distance > game.draw_amount:
+            # the draw counter may run out before the end
+            return None
+        player1_wins = (result == type(self).WIN) == (
+            game.current_player == game.player1
+        )
+        score = type(self).win_score - ply - distance
+        return score if player1_wins else -score
+
+    @classmethod
+    def score_to_table(cls, score, ply):
+        """
+        Get the score to store in a transposition table: the distance of a win is counted
+        from the node instead of the root, as the node may be reached at another ply.
+        :param score: score of the player1 in the node (number)
+        :param ply: distance of the node from the root (int)
+        :return: number
+        """
+        if score >= cls.win_threshold:
+            return score + ply
+        if score <= -cls.win_threshold:
+            return score - ply
+        return score
+
+    @classmethod
+    def score_from_table(cls, score, ply):
+        """Get the score of the node from a score stored with score_to_table."""
+        if score >= cls.win_threshold:
+            return score - ply
+        if score <= -cls.win_threshold:
+            return score + ply
+        return score
+
+    def close(self):
+        self.data.close()
+
+    def __getstate__(self):
+        # processes of the parallel search map the file on their own
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __repr__(self):
+        return f"Tablebase({self.path!r}, max_pieces={self.max_pieces})"
+
+
+def generate(max_pieces=3, width=Checkers.default_width, out=None):
+    """
+    Solve every position with at most max_pieces pieces by retrograde analysis. Moves of
+    all positions are generated once, then results spread backwards from the ends of the
+    game: a position is won in d + 1 moves if a move leads to a position lost in d moves,
+    and lost in d + 1 moves once every move leads to a won position, the last one in d
+    moves. Positions never reached this way are draws.
+    :param max_pieces: maximum number of pieces of both players (int)
+    :param width: width of the board, even (int)
+    :param out: stream for progress messages (optional)
+    :return: tuple (offsets, entries) - see Tablebase.write
+    """
+    if width % 2:
+        raise ValueError("Tablebases need a board of even width.")
+    squares = width * width // 2
+    offsets = {}
+    total = 0
+    for material in materials(max_pieces):
+        offsets[material] = total
+        total += material_size(squares, material)
+    bits = []
+    for square in range(squares):
+        row, col = divmod(2 * square, width)
+        bits.append(1 << (row * width + col + (row + 1) % 2))
+    entries = array("H", bytes(2 * total))
+    remaining = array("H", bytes(2 * total))
+    sources = array("l")
+    targets = array("l")
+    buckets = [[], []]  # positions solved in 0, 1, 2... moves
+    start = time.perf_counter()
+
+    def index_of(game):
+        groups = _bitboard_groups(game)
+        material = tuple(len(group) for group in groups)
+        return offsets[material] + position_index(squares, groups, game.current)
+
+    for material, offset in offsets.items():
+        positions = 0
+        for groups in _placements(squares, material):
+            masks = [sum(bits[square] for square in group) for group in groups]
+            for side in (0, 1):
+                game = BitboardCheckers(width)
+                game.pieces = [masks[0] | masks[1], masks[2] | masks[3]]
+                game.kings = masks[1] | masks[3]
+                game.current = side
+                node = offset + position_index(squares, groups, side)
+                children = game.generate_moves()
+                edges = []
+                won = False
+                for _, child in children:
+                    if child.winner is None:
+                        edges.append(index_of(child))
+                    elif child.winner != child.current:
+                        won = True
+                        break
+                    # else the move loses at once
+                if won:
+                    entries[node] = Tablebase.WIN | 1 << 2
+                    buckets[1].append(node)
+                elif not edges:
+                    distance = 1 if children else 0
+                    entries[node] = Tablebase.LOSS | distance << 2
+                    buckets[distance].append(node)
+                else:
+                    entries[node] = Tablebase.DRAW
+                    remaining[node] = len(edges)
+                    sources.extend([node] * len(edges))
+                    targets.extend(edges)
+                positions += 1
+        if out is not None:
+            print(
+                f"{'material ' + ''.join(map(str, material)):<20}{positions:>10} "
+                f"positions, {time.perf_counter() - start:.1f} s",
+                file=out,
+            )
+    # predecessors of every position, grouped by the position
+    first = array("l", bytes(array("l").itemsize * (total + 1)))
+    for target in targets:
+        first[target + 1] += 1
+    for node in range(total):
+        first[node + 1] += first[node]
+    filled = array("l", first)
+    predecessors = array("l", bytes(array("l").itemsize * len(targets)))
+    for source, target in zip(sources, targets):
+        predecessors[filled[target]] = source
+        filled[target] += 1
+    del sources, targets, filled
+    distance = 0
+    while distance < len(buckets):
+        if distance + 1 == len(buckets):
+            buckets.append([])
+        solved = buckets[distance + 1]
+        for node in buckets[distance]:
+            lost = entries[node] & 3 == Tablebase.LOSS
+            for predecessor in predecessors[first[node] : first[node + 1]]:
+                if entries[predecessor] != Tablebase.DRAW:
+                    continue
+                if lost:
+                    entries[predecessor] = Tablebase.WIN | (distance + 1) << 2
+                    solved.append(predecessor)
+                else:
+                    remaining[predecessor] -= 1
+                    if not remaining[predecessor]:
+                        entries[predecessor] = Tablebase.LOSS | (distance + 1) << 2
+                        solved.append(predecessor)
+        buckets[distance] = None
+        distance += 1
+        if not solved:
+            break
+    if out is not None:
+        print(
+            f"solved in {time.perf_counter() - start:.1f} s, the longest result "
+            f"takes {distance - 1} moves",
+            file=out,
+        )
+    return offsets, entries
+
+
+def count_results(entries):
+    """Count entries of every result: a dict result -> number of positions."""
+    counts = {Tablebase.WIN: 0, Tablebase.LOSS: 0, Tablebase.DRAW: 0}
+    for entry in entries:
+        if entry:
+            counts[entry & 3] += 1
+    return counts
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build an endgame tablebase of positions with few pieces."
+    )
+    parser.add_argument(
+        "--pieces",
+        type=int,
+        default=3,
+        help="maximum number of pieces of both players (4 takes hours)",
+    )
+    parser.add_argument(
+        "--width", type=int, default=Checkers.default_width, help="width of the board"
+    )
+    parser.add_argument("--output", default="endgame.tb", help="path of the file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    offsets, entries = generate(arguments.pieces, arguments.width, sys.stdout)
+    Tablebase.write(
+        arguments.output, arguments.width, arguments.pieces, offsets, entries
+    )
+    counts = count_results(entries)
+    print(
+        f"{arguments.output}: {counts[Tablebase.WIN]} won, {counts[Tablebase.LOSS]} "
+        f"lost, {counts[Tablebase.DRAW]} drawn positions"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
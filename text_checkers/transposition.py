@@ -0,0 +1,166 @@
+import struct
+
+
+class TranspositionTable:
+    """
+    A class representing a fixed-size transposition table of the alpha-beta search.
+
+    Entries are packed into one buffer, so the memory used is fixed when the table is
+    created and the buffer may be shared with other processes. An entry is found by the
+    Zobrist hash of the position (Checkers.hash). The key is stored xor-ed with the rest of
+    the entry, so an entry torn by two processes writing at once never matches a key.
+
+    class variables:
+        EMPTY, EXACT, LOWER, UPPER - kinds of the bound of a stored score,
+        entry_format - struct format of an entry: check (key xor data words), score, move,
+            depth, bound, age,
+        words_format - struct format of an entry seen as three words: check, data words,
+        no_move - move code of an entry without a best move
+
+    attributes:
+        size - number of entries (int),
+        replacement - replacement policy: "depth" keeps a deeper entry of the current search,
+            "always" overwrites every time (str),
+        age - number of the current search, entries of older searches are replaced first (int),
+        buffer - memory of the entries (writable buffer),
+        hits - probes which found the position (int),
+        misses - probes which found an empty entry (int),
+        collisions - probes which found an entry of another position (int),
+        stores - entries written (int),
+        rejected - stores refused by the replacement policy (int)
+    """
+
+    EMPTY = 0
+    EXACT = 1
+    LOWER = 2
+    UPPER = 3
+    entry_format = struct.Struct("<QdIhBB")
+    words_format = struct.Struct("<QQQ")
+    no_move = 0xFFFFFFFF
+    replacement_policies = ("depth", "always")
+
+    def __init__(self, size_mb=16, replacement="depth", buffer=None):
+        if replacement not in type(self).replacement_policies:
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        entry_size = type(self).entry_format.size
+        if buffer is None:
+            self.size = max(1, int(size_mb * 2**20) // entry_size)
+            buffer = bytearray(self.size * entry_size)
+        else:
+            self.size = len(buffer) // entry_size
+        self.buffer = buffer
+        self.replacement = replacement
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.rejected = 0
+
+    @staticmethod
+    def encode_move(step, width):
+        """
+        Pack a step of a move into an int.
+        :param step: tuple of positions: origin, destination (tuples of coordinates - row, column)
+        :param width: width of the board
+        :return: int
+        """
+        (row, col), (dest_row, dest_col) = step
+        return (row * width + col) << 16 | (dest_row * width + dest_col)
+
+    @staticmethod
+    def decode_move(code, width):
+        """Unpack a step packed with encode_move (None for no move)."""
+        if code == TranspositionTable.no_move:
+            return None
+        orig, dest = divmod(code, 1 << 16)
+        return divmod(orig, width), divmod(dest, width)
+
+    def new_search(self):
+        """Mark the entries stored so far as older than the ones of the next search."""
+        self.age = (self.age + 1) % 256
+
+    def clear(self):
+        self.buffer[:] = bytes(len(self.buffer))
+        self.age = 0
+
+    def probe(self, key):
+        """
+        Get the entry of the position.
+        :param key: hash of the position (int)
+        :return: None or tuple: depth, bound, score, move code
+        """
+        offset = (key % self.size) * type(self).entry_format.size
+        entry_key, (_, score, move, depth, bound, _) = self._read(offset)
+        if bound == type(self).EMPTY:
+            self.misses += 1
+            return None
+        if entry_key != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        return depth, bound, score, move
+
+    def store(self, key, depth, bound, score, move=None):
+        """
+        Save a searched position.
+        :param key: hash of the position (int)
+        :param depth: depth of the search below the position (int)
+        :param bound: EXACT, LOWER or UPPER
+        :param score: score of the position (float)
+        :param move: code of the best move (int, optional)
+        """
+        offset = (key % self.size) * type(self).entry_format.size
+        entry_key, (_, _, old_move, old_depth, old_bound, old_age) = self._read(offset)
+        if (
+            self.replacement == "depth"
+            and old_bound != type(self).EMPTY
+            and old_age == self.age
+            and entry_key != key
+            and old_depth > depth
+        ):
+            self.rejected += 1
+            return
+        if move is None:
+            # keep the best move known for the position
+            move = old_move if entry_key == key else type(self).no_move
+        _, first, second = type(self).words_format.unpack(
+            type(self).entry_format.pack(0, score, move, depth, bound, self.age)
+        )
+        type(self).words_format.pack_into(
+            self.buffer, offset, key ^ first ^ second, first, second
+        )
+        self.stores += 1
+
+    def _read(self, offset):
+        """
+        Function used internally. Read the entry at the offset at once, so the key and the
+        data come from the same write even if another process writes the entry meanwhile.
+        :return: tuple: key of the entry, fields of entry_format
+        """
+        check, first, second = type(self).words_format.unpack_from(self.buffer, offset)
+        fields = type(self).entry_format.unpack(
+            type(self).words_format.pack(0, first, second)
+        )
+        return check ^ first ^ second, fields
+
+    def stats(self):
+        """
+        Get the counters of the table.
+        :return: dict
+        """
+        probes = self.hits + self.misses + self.collisions
+        return {
+            "size": self.size,
+            "memory": len(self.buffer),
+            "probes": probes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "stores": self.stores,
+            "rejected": self.rejected,
+        }
+
+    def __repr__(self):
+        return f"TranspositionTable of {self.size} entries"
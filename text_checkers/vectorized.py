@@ -0,0 +1,611 @@
+try:
+    import numpy as np
+except ImportError:  # optional, installed with the "vectorized" extra
+    np = None
+from Checkers import Checkers, BitboardCheckers
+from codec import flag_player2, flag_must_continue, decode_array, record_dtype
+from evaluation import Evaluation
+
+# A batch of positions is an array of rows of four uint64: pieces of player1, pieces of
+# player2, kings and the player to move (0 for player1, 1 for player2) - the compact form
+# of selfplay.position, so the plies of self-play records load with
+# numpy.array([ply[:4] for ply in plies], dtype=numpy.uint64). Move generation also takes
+# a fifth column, the mask of cells removed in the current round (0 when missing). A square
+# (row, col) is the bit row * width + col, so boards up to 8x8 fit.
+
+_shifts = {}
+
+
+def _require_numpy():
+    """Function used internally. ImportError when NumPy is missing."""
+    if np is None:
+        raise ImportError(
+            "NumPy is needed for vectorized functions, install the vectorized extra."
+        )
+
+
+def _geometry(width):
+    """
+    Function used internally. Get tables of the board of the given width (built once per
+    width).
+    :return: tuple: mask of the whole board, for every direction a tuple (source mask
+        keeping the shift from wrapping around the board edge, step of the shift), forward
+        directions of each player (indices into directions), promotion row masks of each
+        player, rays (array of squares of shape (squares, 4, width - 1), -1 past the edge),
+        bits (array of the uint64 mask of every square)
+    """
+    if width not in _shifts:
+        _require_numpy()
+        if width * width > 64:
+            raise ValueError(f"Boards wider than 8 do not fit a batch: {width}")
+        rays, forward, promotion, full, column_masks = BitboardCheckers.geometry(width)
+        shifts = tuple(
+            (np.uint64(column_mask), d_row * width + d_col)
+            for column_mask, (d_row, d_col) in zip(
+                column_masks, BitboardCheckers.directions
+            )
+        )
+        table = np.full((width * width, 4, width - 1), -1, dtype=np.int64)
+        for square, square_rays in enumerate(rays):
+            for direction, ray in enumerate(square_rays):
+                table[square, direction, : len(ray)] = ray
+        _shifts[width] = (
+            np.uint64(full),
+            shifts,
+            forward,
+            tuple(np.uint64(mask) for mask in promotion),
+            table,
+            np.uint64(1) << np.arange(width * width, dtype=np.uint64),
+        )
+    return _shifts[width]
+
+
+def shift(masks, direction, width=Checkers.default_width):
+    """
+    Move every square of every mask one step in the direction, as BitboardCheckers._shift.
+    :param masks: array of uint64 masks
+    :param direction: index into BitboardCheckers.directions (int)
+    :param width: width of the board (int)
+    :return: array of uint64 masks, squares leaving the board are dropped
+    """
+    full, shifts = _geometry(width)[:2]
+    source, step = shifts[direction]
+    masks = masks & source
+    if step > 0:
+        return (masks << np.uint64(step)) & full
+    return masks >> np.uint64(-step)
+
+
+def count(masks):
+    """
+    Count squares of masks.
+    :param masks: array of uint64 masks
+    :return: array of int64 of the same shape
+    """
+    _require_numpy()
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks).astype(np.int64)
+    return square_bits(masks).sum(axis=-1, dtype=np.int64)
+
+
+def square_bits(masks, width=Checkers.default_width):
+    """
+    Unpack masks into one column per square.
+    :param masks: array of uint64 masks of any shape
+    :param width: width of the board (int)
+    :return: array of uint8 zeros and ones, the shape of masks followed by width * width
+    """
+    _geometry(width)
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    bits = np.unpackbits(
+        masks[..., np.newaxis].view(np.uint8), axis=-1, bitorder="little"
+    )
+    return bits[..., : width * width]
+
+
+def position_masks(game):
+    """
+    Get the row of a batch describing the position of the game.
+    :param game: game (class Checkers or BitboardCheckers)
+    :return: tuple of ints (pieces of player1, pieces of player2, kings, player to move)
+    """
+    if isinstance(game, BitboardCheckers):
+        return game.pieces[0], game.pieces[1], game.kings, game.current
+    width = game.board.width
+    pieces = [0, 0]
+    kings = 0
+    for side, player in enumerate((game.player1, game.player2)):
+        for piece, (row, col) in player.pieces.items():
+            bit = 1 << (row * width + col)
+            pieces[side] |= bit
+            if piece.is_king():
+                kings |= bit
+    return pieces[0], pieces[1], kings, 0 if game.current_player == game.player1 else 1
+
+
+def encode_positions(games):
+    """
+    Encode positions into a batch.
+    :param games: iterable of games (class Checkers or BitboardCheckers) of the same width
+    :return: array of shape (number of games, 4) and type uint64
+    """
+    _require_numpy()
+    rows = [position_masks(game) for game in games]
+    return np.array(rows, dtype=np.uint64).reshape(len(rows), 4)
+
+
+_mask_fields = ("player1", "player2", "kings", "blocked")
+
+
+def from_records(data, width=Checkers.default_width):
+    """
+    Read binary records of codec into a batch without building games.
+    :param data: bytes-like object of records of codec.encode_batch of the same width, or
+        an array of codec.record_dtype (from codec.decode_array or codec.read_array)
+    :param width: width of the board (int)
+    :return: array of shape (number of records, 5) and type uint64, blocked cells last
+    """
+    _geometry(width)
+    records = data if isinstance(data, np.ndarray) else decode_array(data, width)
+    size = record_dtype(width)["player1"].shape[0]
+    masks = np.zeros((len(records), 4, 8), dtype=np.uint8)
+    for i, name in enumerate(_mask_fields):
+        masks[:, i, :size] = records[name]
+    masks = masks.view("<u8")[:, :, 0].astype(np.uint64)
+    side = (records["flags"] & flag_player2).astype(np.uint64)
+    return np.stack((masks[:, 0], masks[:, 1], masks[:, 2], side, masks[:, 3]), axis=1)
+
+
+def to_records(
+    positions, width=Checkers.default_width, counters=None, must_continue=None
+):
+    """
+    Write a batch into binary records of codec at once, the inverse of from_records
+    (codec.encode_array gives the bytes, codec.write_array the file).
+    :param positions: batch of positions (array of shape (n, 4) or (n, 5) and type uint64)
+    :param width: width of the board (int)
+    :param counters: draw counters of the positions (array of n ints from 0 to 255,
+        optional - zeros)
+    :param must_continue: whether the player must continue the move (array of n bools,
+        optional - where cells are blocked)
+    :return: array of codec.record_dtype
+    """
+    _geometry(width)
+    positions = np.asarray(positions, dtype=np.uint64).reshape(len(positions), -1)
+    dtype = record_dtype(width)
+    size = dtype["player1"].shape[0]
+    blocked = (
+        positions[:, 4]
+        if positions.shape[1] > 4
+        else np.zeros(len(positions), dtype=np.uint64)
+    )
+    if must_continue is None:
+        must_continue = blocked != 0
+    records = np.zeros(len(positions), dtype=dtype)
+    records["width"] = width
+    records["flags"] = np.where(positions[:, 3] != 0, flag_player2, 0) | np.where(
+        must_continue, flag_must_continue, 0
+    )
+    if counters is not None:
+        counters = np.asarray(counters)
+        if ((counters < 0) | (counters > 255)).any():
+            raise ValueError("Draw counters must be from 0 to 255.")
+        records["counter"] = counters
+    columns = (positions[:, 0], positions[:, 1], positions[:, 2], blocked)
+    for name, column in zip(_mask_fields, columns):
+        records[name] = column.astype("<u8").view(np.uint8).reshape(-1, 8)[:, :size]
+    return records
+
+
+def mobility(positions, width=Checkers.default_width):
+    """
+    Count the steps the pieces of each player could make to an adjacent empty square: men
+    forward, kings in every direction. Blocked cells and captures are not counted.
+    :param positions: batch of positions (array of shape (n, 4) and type uint64)
+    :param width: width of the board (int)
+    :return: array of shape (n, 2) and type int64, steps of player1 first
+    """
+    full, _, forward = _geometry(width)[:3]
+    positions = np.asarray(positions, dtype=np.uint64)
+    pieces = positions[:, :2]
+    kings = positions[:, 2:3]
+    empty = full & ~(pieces[:, 0:1] | pieces[:, 1:2])
+    men = pieces & ~kings
+    own_kings = pieces & kings
+    steps = np.zeros(pieces.shape, dtype=np.int64)
+    for side in (0, 1):
+        for direction in forward[side]:
+            steps[:, side] += count(shift(men[:, side], direction, width) & empty[:, 0])
+    for direction in range(4):
+        steps += count(shift(own_kings, direction, width) & empty)
+    return steps
+
+
+def evaluate_batch(
+    positions, evaluation=None, mobility_weight=0, width=Checkers.default_width
+):
+    """
+    Evaluate a batch of positions at once. Material, piece-square and king terms are the
+    ones of Checkers.value for the same weights, mobility_weight adds the value of every
+    step counted by mobility.
+    :param positions: batch of positions (array of shape (n, 4) and type uint64)
+    :param evaluation: weights of the evaluation (class Evaluation, optional - the default
+        weights of Checkers)
+    :param mobility_weight: value of a step of a piece of player1 (number)
+    :param width: width of the board (int)
+    :return: array of n scores of player1
+    """
+    if evaluation is None:
+        evaluation = Evaluation()
+    positions = np.asarray(positions, dtype=np.uint64)
+    kings = positions[:, 2]
+    masks = np.stack(
+        (
+            positions[:, 0] & ~kings,
+            positions[:, 0] & kings,
+            positions[:, 1] & ~kings,
+            positions[:, 1] & kings,
+        ),
+        axis=1,
+    )
+    tables = np.asarray(evaluation.tables(width))
+    scores = np.einsum(
+        "nks,ks->n", square_bits(masks, width).astype(tables.dtype), tables
+    )
+    if mobility_weight:
+        steps = mobility(positions, width)
+        scores = scores + mobility_weight * (steps[:, 0] - steps[:, 1])
+    return scores
+
+
+class BatchEvaluation:
+    """
+    A class representing the evaluation of the leaves of an in-place search in batches:
+    a node of depth 1 collects the positions after all of its moves and evaluates them
+    with a single call of evaluate_batch.
+
+    attributes:
+        evaluation - weights of material, piece-square and king terms (class Evaluation),
+        mobility_weight - value of a step of a piece, see mobility (number),
+        width - width of the board (int)
+    """
+
+    def __init__(
+        self, evaluation=None, mobility_weight=0, width=Checkers.default_width
+    ):
+        _geometry(width)
+        self.evaluation = Evaluation() if evaluation is None else evaluation
+        self.mobility_weight = mobility_weight
+        self.width = width
+
+    def evaluate(self, positions):
+        """
+        Evaluate positions.
+        :param positions: rows of a batch (iterable of tuples of position_masks)
+        :return: a list of scores of player1
+        """
+        positions = np.array(positions, dtype=np.uint64).reshape(-1, 4)
+        return evaluate_batch(
+            positions, self.evaluation, self.mobility_weight, self.width
+        ).tolist()
+
+    def evaluate_games(self, games):
+        """Evaluate positions of games (class Checkers or BitboardCheckers)."""
+        return self.evaluate([position_masks(game) for game in games])
+
+    def __repr__(self):
+        return (
+            f"BatchEvaluation({self.evaluation!r}, "
+            f"mobility_weight={self.mobility_weight}, width={self.width})"
+        )
+
+
+def _columns(positions):
+    """
+    Function used internally. Split a batch into masks of the player to move.
+    :return: tuple of uint64 arrays: own pieces, enemy pieces, kings, blocked cells, and the
+        player to move (int array)
+    """
+    positions = np.asarray(positions, dtype=np.uint64).reshape(len(positions), -1)
+    side = positions[:, 3].astype(np.int64)
+    blocked = (
+        positions[:, 4] if positions.shape[1] > 4 else np.zeros_like(side, np.uint64)
+    )
+    own = np.where(side == 0, positions[:, 0], positions[:, 1])
+    enemies = np.where(side == 0, positions[:, 1], positions[:, 0])
+    return own, enemies, positions[:, 2], blocked, side
+
+
+def _normal_jumps(square, own, enemies, stop, width):
+    """
+    Function used internally. Continuations of items of a search of the depth of a man
+    attack, the same as the calls made by BitboardCheckers._normal_attack_depth.
+    :param square: squares of the items (int array)
+    :param own, enemies: masks of pieces of the items (uint64 arrays)
+    :param stop: masks of blocked and ignored squares of the items (uint64 arrays)
+    :return: a list of tuples (items, landing squares, masks added to ignored squares)
+    """
+    _, _, _, _, rays, bits = _geometry(width)
+    occupied = own | enemies
+    found = []
+    for direction in range(4):
+        ray = rays[square, direction]
+        active = np.ones(len(square), dtype=bool)
+        attack = np.zeros(len(square), dtype=bool)
+        for i in range(width - 1):
+            next_square = ray[:, i]
+            active &= next_square >= 0
+            bit = np.where(active, bits[next_square], np.uint64(0))
+            active &= (stop & bit) == 0
+            empty = (occupied & bit) == 0
+            landing = np.nonzero(active & attack & empty)[0]
+            if len(landing):
+                found.append((landing, next_square[landing], bits[ray[landing, i - 1]]))
+            # after an enemy every empty square is a landing, the square before it ignored
+            active &= np.where(attack, empty, (enemies & bit) != 0)
+            attack = active
+            if not active.any():
+                break
+    return found
+
+
+def _king_jumps(square, own, enemies, stop, width):
+    """
+    Function used internally. Continuations of items of a search of the depth of a king
+    attack, the same as the calls made by BitboardCheckers._king_attack_depth, see
+    _normal_jumps.
+    """
+    _, _, _, _, rays, bits = _geometry(width)
+    found = []
+    for direction in range(4):
+        ray = rays[square, direction]
+        active = np.ones(len(square), dtype=bool)
+        attacked = np.zeros(len(square), dtype=np.uint64)
+        for i in range(width - 1):
+            next_square = ray[:, i]
+            active &= next_square >= 0
+            bit = np.where(active, bits[next_square], np.uint64(0))
+            active &= ((stop | own) & bit) == 0
+            enemy = (enemies & bit) != 0
+            landing = np.nonzero(active & ~enemy & (attacked != 0))[0]
+            if len(landing):
+                found.append((landing, next_square[landing], attacked[landing]))
+            active &= ~(enemy & (attacked != 0))
+            attacked = np.where(active & enemy, bit, attacked)
+            if not active.any():
+                break
+    return found
+
+
+def _depths(square, own, enemies, stop, king, width):
+    """
+    Function used internally. Depth of the longest attack continuing from every item,
+    searched level by level for all items at once.
+    :param square: squares of the items (int array)
+    :param own, enemies: masks of pieces of the items (uint64 arrays)
+    :param stop: masks of blocked and ignored squares of the items (uint64 arrays)
+    :param king: whether the attacking piece of the items is a king (bool array)
+    :return: int array
+    """
+    depth = np.zeros(len(square), dtype=np.int64)
+    root = np.arange(len(square))
+    level = 0
+    while len(root):
+        depth[root] = level
+        level += 1
+        roots, squares, stops = [], [], []
+        for is_king, jumps in ((False, _normal_jumps), (True, _king_jumps)):
+            select = np.nonzero(king[root] == is_king)[0]
+            if not len(select):
+                continue
+            parents = root[select]
+            for items, landing, ignored in jumps(
+                square[select], own[parents], enemies[parents], stop[select], width
+            ):
+                roots.append(parents[items])
+                squares.append(landing)
+                stops.append(stop[select[items]] | ignored)
+        if not roots:
+            break
+        root = np.concatenate(roots)
+        square = np.concatenate(squares)
+        stop = np.concatenate(stops)
+    return depth
+
+
+def _attacks(square, own, enemies, blocked, king, width):
+    """
+    Function used internally. Attacking steps of pieces with the longest attack, the same as
+    BitboardCheckers.possible_normal_attacks and possible_king_attacks.
+    :param square: squares of the pieces (int array)
+    :param own, enemies, blocked: masks of the positions of the pieces (uint64 arrays)
+    :param king: whether the pieces are kings (bool array)
+    :return: tuple of arrays: indices of the pieces, destination squares, captured masks
+    """
+    _, _, _, _, rays, bits = _geometry(width)
+    pieces, destinations, captured = [], [], []
+    occupied = own | enemies
+    men = np.nonzero(~king)[0]
+    for direction in range(4):
+        ray = rays[square[men], direction]
+        over, landing = ray[:, 0], ray[:, 1]
+        valid = landing >= 0
+        over_bit = np.where(valid, bits[over], np.uint64(0))
+        landing_bit = np.where(valid, bits[landing], np.uint64(0))
+        select = np.nonzero(
+            valid
+            & ((enemies[men] & over_bit) != 0)
+            & ((occupied[men] & landing_bit) == 0)
+        )[0]
+        pieces.append(men[select])
+        destinations.append(landing[select])
+        captured.append(over_bit[select])
+    kings = np.nonzero(king)[0]
+    for direction in range(4):
+        ray = rays[square[kings], direction]
+        active = np.ones(len(kings), dtype=bool)
+        attacked = np.zeros(len(kings), dtype=np.uint64)
+        # only the first attacked piece must be followed by an empty cell
+        follow = np.zeros(len(kings), dtype=bool)
+        for i in range(width - 1):
+            next_square = ray[:, i]
+            active &= next_square >= 0
+            bit = np.where(active, bits[next_square], np.uint64(0))
+            active &= ((blocked[kings] | own[kings]) & bit) == 0
+            enemy = (enemies[kings] & bit) != 0
+            active &= ~(enemy & follow)
+            landing = active & ~enemy & (attacked != 0)
+            select = np.nonzero(landing)[0]
+            pieces.append(kings[select])
+            destinations.append(next_square[select])
+            captured.append(attacked[select])
+            follow = np.where(enemy, attacked == 0, follow & ~landing)
+            attacked = np.where(active & enemy, attacked | bit, attacked)
+            if not active.any():
+                break
+    pieces = np.concatenate(pieces)
+    destinations = np.concatenate(destinations)
+    captured = np.concatenate(captured)
+    stop = np.where(king[pieces], blocked[pieces] | captured, blocked[pieces])
+    depth = _depths(
+        destinations, own[pieces], enemies[pieces], stop, king[pieces], width
+    )
+    # a man on the first row attacks without looking further
+    depth[~king[pieces] & (square[pieces] < width)] = 0
+    longest = np.zeros(len(square), dtype=np.int64)
+    np.maximum.at(longest, pieces, depth)
+    select = depth == longest[pieces]
+    return pieces[select], destinations[select], captured[select]
+
+
+def _sorted(columns):
+    """Function used internally. Concatenate parts of columns and sort rows by them."""
+    columns = [np.concatenate(parts) for parts in columns]
+    order = np.lexsort(columns[::-1])
+    return tuple(column[order] for column in columns)
+
+
+def legal_steps(positions, width=Checkers.default_width):
+    """
+    Get the possible first steps of the player to move in every position of a batch, the
+    same as Checkers.get_possible_moves.
+    :param positions: batch of positions (array of shape (n, 4) or (n, 5) and type uint64)
+    :param width: width of the board (int)
+    :return: tuple of arrays, one row per step sorted by position and squares: indices of
+        positions, origin squares, destination squares, masks of enemy pieces between the
+        squares, captured by the step
+    """
+    full, _, forward, _, rays, bits = _geometry(width)
+    own, enemies, kings, blocked, side = _columns(positions)
+    index, square = np.nonzero(square_bits(own, width))
+    king = (kings[index] & bits[square]) != 0
+    pieces, destinations, captured = _attacks(
+        square, own[index], enemies[index], blocked[index], king, width
+    )
+    rows = [[index[pieces]], [square[pieces]], [destinations], [captured]]
+    attacking = np.zeros(len(own), dtype=bool)
+    attacking[index[pieces]] = True
+    empty = full & ~(own | enemies)
+    men = np.where(attacking, np.uint64(0), own & ~kings)
+    for player in (0, 1):
+        for direction in forward[player]:
+            targets = shift(
+                np.where(side == player, men, np.uint64(0)), direction, width
+            )
+            moved, dest = np.nonzero(square_bits(targets & empty, width))
+            d_row, d_col = BitboardCheckers.directions[direction]
+            rows[0].append(moved)
+            rows[1].append(dest - (d_row * width + d_col))
+            rows[2].append(dest)
+            rows[3].append(np.zeros(len(dest), dtype=np.uint64))
+    # a king moves through pieces, only blocked cells stop it, and Checkers.move captures
+    # the enemies it passes
+    kings_moving = np.nonzero(king & ~attacking[index])[0]
+    position = index[kings_moving]
+    for direction in range(4):
+        ray = rays[square[kings_moving], direction]
+        active = np.ones(len(kings_moving), dtype=bool)
+        passed = np.zeros(len(kings_moving), dtype=np.uint64)
+        for i in range(width - 1):
+            next_square = ray[:, i]
+            active &= next_square >= 0
+            bit = np.where(active, bits[next_square], np.uint64(0))
+            active &= (blocked[position] & bit) == 0
+            select = np.nonzero(active & ((empty[position] & bit) != 0))[0]
+            rows[0].append(position[select])
+            rows[1].append(square[kings_moving[select]])
+            rows[2].append(next_square[select])
+            rows[3].append(passed[select])
+            passed |= enemies[position] & bit
+            if not active.any():
+                break
+    return _sorted(rows)
+
+
+def legal_moves(positions, width=Checkers.default_width):
+    """
+    Get every complete move of the player to move in every position of a batch, the same
+    as Checkers.move_paths: a multi-jump sequence is a single move, followed step by step
+    for all positions at once.
+    :param positions: batch of positions (array of shape (n, 4) or (n, 5) and type uint64)
+    :param width: width of the board (int)
+    :return: tuple of arrays, one row per move sorted by position and squares: indices of
+        positions, origin squares, final squares, masks of all captured pieces
+    """
+    _, _, _, promotion, _, bits = _geometry(width)
+    own, enemies, kings, blocked, side = _columns(positions)
+    index, origin, dest, captured = legal_steps(positions, width)
+    square = origin
+    total = np.zeros(len(index), dtype=np.uint64)
+    own, enemies, kings, blocked = (
+        own[index],
+        enemies[index],
+        kings[index],
+        blocked[index],
+    )
+    promotion = np.array(promotion)[side[index]]
+    rows = [[], [], [], []]
+    while len(index):
+        moved = bits[square] | bits[dest]
+        king = (kings & bits[square]) != 0
+        own = own ^ moved
+        enemies = enemies & ~captured
+        kings = np.where(king, kings ^ moved, kings) & ~captured
+        blocked = blocked | captured
+        total = total | captured
+        # a man reaching the last row continues only when it can attack, as a man
+        go_on = np.nonzero((captured != 0) | (~king & ((promotion & bits[dest]) != 0)))[
+            0
+        ]
+        attacks = np.zeros(len(index), dtype=bool)
+        if len(go_on):
+            pieces, next_dest, next_captured = _attacks(
+                dest[go_on],
+                own[go_on],
+                enemies[go_on],
+                blocked[go_on],
+                king[go_on],
+                width,
+            )
+            attacks[go_on[pieces]] = True
+        done = np.nonzero(~attacks)[0]
+        for column, values in zip(rows, (index, origin, dest, total)):
+            column.append(values[done])
+        if not len(go_on):
+            break
+        follow = go_on[pieces]
+        index, origin, square, dest, captured = (
+            index[follow],
+            origin[follow],
+            dest[follow],
+            next_dest,
+            next_captured,
+        )
+        own, enemies, kings, blocked = (
+            own[follow],
+            enemies[follow],
+            kings[follow],
+            blocked[follow],
+        )
+        total, promotion = total[follow], promotion[follow]
+    return _sorted(rows)